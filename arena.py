@@ -0,0 +1,1180 @@
+# arena.py
+"""
+One self-contained match world for the LAN Tanks server.
+
+- All world state lives on an Arena instance (no module globals)
+- RNG and clock are injectable so a world can be driven headless
+- handle_client/run are the per-connection and tick threads for it
+- On maps larger than the screen each player is sent only the entities
+  near its view (area of interest), looked up in a spatial index
+- Bullets are swept along their whole step (segment vs box), so they
+  cannot skip through walls or tanks at low tick rates or high speeds;
+  per-tick speeds are scaled by SPEED_TICK_RATE / SERVER_TICK_RATE
+- With a parallel_tick.TickPool (free-threaded CPython), the per-tank and
+  per-bullet parts of a tick run on several threads; their effects are
+  merged in a fixed order, so the result matches a serial tick exactly
+"""
+
+import json
+import math
+import random
+import socket
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+    import termios
+    _TIOCOUTQ = termios.TIOCOUTQ
+except (ImportError, AttributeError):
+    _TIOCOUTQ = None  # send-queue depth is only sampled where the kernel exposes it
+
+from game_config import (
+    SCREEN_WIDTH, SCREEN_HEIGHT,
+    WORLD_WIDTH, WORLD_HEIGHT,
+    TANK_SIZE, TANK_SPEED,
+    BULLET_SPEED, BULLET_SIZE,
+    POWERUP_SIZE, POWERUP_RESPAWN_TIME, POWERUP_MAX, POWERUP_DURATION,
+    TRAP_SIZE, TRAP_DAMAGE, TRAP_COOLDOWN, TRAP_MAX_ACTIVE,
+    SERVER_TICK_RATE, SPEED_TICK_RATE,
+    PROFILE_TRIGGER_FILE, PROFILE_DEFAULT_TICKS, PROFILE_OUTPUT_DIR,
+    COMPRESSION_ENABLED, COMPRESSION_LEVEL, COMPRESSION_DICT,
+    AOI_ENABLED, AOI_MARGIN, AOI_CELL_SIZE,
+    BOT_BUDGET_MS,
+    OBSTACLES,
+)
+from entities import Player, Bullet, Trap, Powerup, EntityPool
+from tick_profiler import TickProfiler, ProfileTrigger
+from metrics import REGISTRY
+from event_log import EVENTS
+from bots import BotController, BOT_FIELDS, BOT_SKIPPED
+from spatial import SpatialGrid, BoxGrid, view_origin
+import compression
+import transport
+
+WEAPON_STATS = {
+    "basic": {"speed": BULLET_SPEED, "damage": 1, "count": 1, "spread_deg": 0},
+    "rapid": {"speed": BULLET_SPEED + 3, "damage": 1, "count": 1, "spread_deg": 0},
+    "heavy": {"speed": BULLET_SPEED + 1, "damage": 2, "count": 1, "spread_deg": 0},
+    "spread": {"speed": BULLET_SPEED, "damage": 1, "count": 3, "spread_deg": 14},
+    "bouncy": {"speed": BULLET_SPEED, "damage": 1, "count": 1, "spread_deg": 0, "bounces": 3},
+}
+
+TICK_SECONDS = REGISTRY.histogram(
+    "tanks_tick_duration_seconds", "Simulation plus broadcast time per tick", ["arena"],
+    buckets=(0.001, 0.002, 0.004, 0.008, 0.0167, 0.0333, 0.0667, 0.1),
+)
+TICK_OVERRUNS = REGISTRY.counter("tanks_tick_overruns_total", "Ticks that ran over the tick budget", ["arena"])
+ENTITIES = REGISTRY.gauge("tanks_entities", "Live entities by kind", ["arena", "kind"])
+BYTES_SENT = REGISTRY.counter("tanks_connection_bytes_sent_total", "Bytes sent per connection", ["arena", "player"])
+BYTES_RECEIVED = REGISTRY.counter("tanks_connection_bytes_received_total", "Bytes received per connection", ["arena", "player"])
+SEND_QUEUE = REGISTRY.gauge("tanks_connection_send_queue_bytes", "Unsent bytes in the socket send buffer", ["arena", "player"])
+INPUT_MESSAGES = REGISTRY.counter("tanks_input_messages_total", "Input messages received", ["arena"])
+ENCODE_SECONDS = REGISTRY.histogram(
+    "tanks_snapshot_encode_seconds", "Time to encode one tick's state frame(s)", ["arena"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025),
+)
+SNAPSHOT_BYTES = REGISTRY.histogram(
+    "tanks_snapshot_bytes", "Encoded state frame size in bytes", ["arena"],
+    buckets=(1024, 4096, 16384, 65536, 262144, 1048576),
+)
+COMPRESS_SECONDS = REGISTRY.histogram(
+    "tanks_snapshot_compress_seconds", "Time to compress one tick's state frame(s)", ["arena"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025),
+)
+COMPRESSED_BYTES = REGISTRY.histogram(
+    "tanks_snapshot_compressed_bytes", "Compressed state frame size in bytes", ["arena"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144),
+)
+
+# loaded once per process; sent to each client that negotiates compression
+STATE_ZDICT = compression.load_dictionary(COMPRESSION_DICT)
+
+# window size assumed for clients whose hello does not state one
+DEFAULT_VIEW = (SCREEN_WIDTH, SCREEN_HEIGHT)
+BULLET_CELL_SIZE = 64  # bullet-vs-bullet broadphase cell in px
+SOLID_CELL_SIZE = 128  # wall lookup cell for the bullet sweep, in px
+STATE_HEAD = '{"type":"state",'  # unstamped frame opening (recording checks, benchmarks)
+MAX_CATCH_UP_TICKS = 5  # a tick loop further behind than this drops the backlog instead of bursting
+
+
+def get_weapon_stats(name: str):
+    return WEAPON_STATS.get(name, WEAPON_STATS["basic"])
+
+
+def _rect_hit(x1, y1, size1, x2, y2, size2):
+    return (x1 < x2 + size2 and x1 + size1 > x2 and
+            y1 < y2 + size2 and y1 + size1 > y2)
+
+
+def _rect_overlap(x1, y1, w1, h1, x2, y2, w2, h2):
+    return (x1 < x2 + w2 and x1 + w1 > x2 and
+            y1 < y2 + h2 and y1 + h1 > y2)
+
+
+def _bullet_rect(bullet):
+    half = BULLET_SIZE / 2
+    return bullet.x - half, bullet.y - half, BULLET_SIZE, BULLET_SIZE
+
+
+def _valid_seq(seq) -> bool:
+    # echoed raw into every state frame as "ack" and recorded as a u32
+    return isinstance(seq, int) and not isinstance(seq, bool) and 0 <= seq <= 0xFFFFFFFF
+
+
+def _hello_view(hello):
+    """
+    (width, height) of the client's window from its hello, within sane bounds.
+    """
+    view = (hello or {}).get("view")
+    try:
+        w, h = int(view[0]), int(view[1])
+    except (TypeError, ValueError, OverflowError, IndexError, KeyError):
+        return DEFAULT_VIEW
+    return max(320, min(w, WORLD_WIDTH)), max(240, min(h, WORLD_HEIGHT))
+
+
+def _collides_obstacle(x, y, size):
+    for ob in OBSTACLES:
+        if _rect_overlap(x, y, size, size, ob["x"], ob["y"], ob["w"], ob["h"]):
+            return True
+    return False
+
+
+def _bullet_hits_solid(x, y):
+    if x < 0 or x > WORLD_WIDTH or y < 0 or y > WORLD_HEIGHT:
+        return True
+    bx = x - BULLET_SIZE / 2
+    by = y - BULLET_SIZE / 2
+    return _collides_obstacle(bx, by, BULLET_SIZE)
+
+
+# obstacles grown by half a bullet on every side (their Minkowski sum with
+# the bullet's square): the bullet touches a wall exactly when its centre
+# is strictly inside one of these, so it can be swept as a point
+_HALF_BULLET = BULLET_SIZE / 2
+_SOLIDS = BoxGrid(
+    [(ob["x"] - _HALF_BULLET, ob["y"] - _HALF_BULLET,
+      ob["x"] + ob["w"] + _HALF_BULLET, ob["y"] + ob["h"] + _HALF_BULLET) for ob in OBSTACLES],
+    WORLD_WIDTH, WORLD_HEIGHT, SOLID_CELL_SIZE,
+)
+
+# speeds are per tick at SPEED_TICK_RATE; at other rates each step covers the same time
+STEP_SCALE = SPEED_TICK_RATE / SERVER_TICK_RATE
+TANK_STEP = TANK_SPEED if STEP_SCALE == 1 else TANK_SPEED * STEP_SCALE
+
+
+def _segment_entry(px, py, dx, dy, x0, y0, x1, y1):
+    """
+    First point where the segment p -> p + d gets strictly inside the open
+    box (x0, x1) x (y0, y1) (slab test). Returns (s, across_x, across_y):
+    the fraction of d travelled, negative when p is already inside, and
+    which box side(s) it crossed; None if it never gets in.
+    """
+    if dx:
+        tx0 = (x0 - px) / dx
+        tx1 = (x1 - px) / dx
+        if tx0 > tx1:
+            tx0, tx1 = tx1, tx0
+    elif x0 < px < x1:
+        tx0, tx1 = -math.inf, math.inf
+    else:
+        return None
+    if dy:
+        ty0 = (y0 - py) / dy
+        ty1 = (y1 - py) / dy
+        if ty0 > ty1:
+            ty0, ty1 = ty1, ty0
+    elif y0 < py < y1:
+        ty0, ty1 = -math.inf, math.inf
+    else:
+        return None
+    enter = tx0 if tx0 > ty0 else ty0
+    leave = tx1 if tx1 < ty1 else ty1
+    if enter >= leave or leave <= 0 or enter >= 1:
+        return None
+    return enter, tx0 == enter, ty0 == enter
+
+
+class Arena:
+    """
+    World state and simulation for a single match.
+    """
+
+    def __init__(self, arena_id: int = 0, rng=None, clock=time.time, fanout=None, recorder=None,
+                 bot_fill: int = 0, tick_pool=None):
+        """
+        :param arena_id: id assigned by the lobby (used in log lines)
+        :param rng: random.Random used for spawns (seed it for repeatable runs)
+        :param clock: callable returning the current time in seconds
+        :param fanout: optional fanout.SnapshotFanout that sends state frames
+        :param recorder: optional recording.MatchRecorder; rng must be seeded with its seed
+        :param bot_fill: while humans are connected, add bots until there are this many tanks
+        :param tick_pool: optional parallel_tick.TickPool to split tick phases across threads
+        """
+        self.arena_id = arena_id
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self.fanout = fanout
+        self.recorder = recorder
+        self.bot_fill = bot_fill
+        self.tick_pool = tick_pool
+
+        self.players = {}      # player_id -> Player
+        self.inputs = {}       # player_id -> latest input dict
+        self.input_seqs = {}   # player_id -> seq of the latest input (optional, echoed as "ack")
+        self.bullets = []      # list of Bullet
+        self.shot_locks = {}   # player_id -> whether shoot is already handled (prevents autofire)
+        self.trap_locks = {}   # player_id -> prevents repeated trap placement while held down
+        self.traps = []        # list of Trap
+        self.powerups = []     # list of Powerup
+        self.last_powerup_spawn = 0.0
+        self.next_powerup_id = 1
+        self.next_player_id = 1
+        self.tick = 0          # update_game calls so far; stamped on outgoing frames
+
+        self.bots = BotController(self, BOT_BUDGET_MS, rng=random.Random(self.rng.getrandbits(32)))
+        self._rebalance_lock = threading.Lock()
+
+        self.bullet_pool = EntityPool(Bullet, 1024)
+        self.trap_pool = EntityPool(Trap, 64)
+
+        self.lock = threading.Lock()
+        self.connections = []
+        self.spectators = []   # sockets that receive frames but have no player
+        self.stop_event = threading.Event()
+
+        # area of interest: only needed once the world no longer fits on one screen
+        self.aoi = AOI_ENABLED and (WORLD_WIDTH > SCREEN_WIDTH or WORLD_HEIGHT > SCREEN_HEIGHT)
+        self.aoi_index = SpatialGrid(WORLD_WIDTH, WORLD_HEIGHT, AOI_CELL_SIZE)
+        self.conn_views = {}  # conn -> (width, height) of that player's window
+        self.outbox = {}      # conn -> lines to send ahead of its next frame, in one sendmsg
+        self._outbox_lock = threading.Lock()
+        self.bullet_index = SpatialGrid(WORLD_WIDTH, WORLD_HEIGHT, BULLET_CELL_SIZE)
+        self.tank_index = SpatialGrid(WORLD_WIDTH, WORLD_HEIGHT, BULLET_CELL_SIZE)  # tank centres, for the bullet sweep
+
+        self.profiler = TickProfiler(
+            f"ARENA {arena_id}", 1000.0 / SERVER_TICK_RATE, output_dir=PROFILE_OUTPUT_DIR
+        )
+        self.profile_trigger = ProfileTrigger(PROFILE_TRIGGER_FILE, PROFILE_DEFAULT_TICKS)
+
+        self.conn_players = {}  # conn -> player_id
+        self.conn_encodings = {}  # conn -> "plain" or compression.ENCODING
+        self.compressed_conns = 0  # how many of them use compression, so the tick never scans the dict
+        self._encodings_lock = threading.Lock()
+        self.compressor = compression.FrameCompressor(STATE_ZDICT, COMPRESSION_LEVEL)
+        self._sent_metrics = {}  # conn -> BYTES_SENT child
+        self._m_tick = TICK_SECONDS.labels(arena=arena_id)
+        self._m_overruns = TICK_OVERRUNS.labels(arena=arena_id)
+        self._m_inputs = INPUT_MESSAGES.labels(arena=arena_id)
+        self._m_encode = ENCODE_SECONDS.labels(arena=arena_id)
+        self._m_snapshot_bytes = SNAPSHOT_BYTES.labels(arena=arena_id)
+        self._m_compress = COMPRESS_SECONDS.labels(arena=arena_id)
+        self._m_compressed_bytes = COMPRESSED_BYTES.labels(arena=arena_id)
+        REGISTRY.add_collector(self._collect_metrics)
+        if recorder is not None:
+            recorder.begin(self)
+
+    def _log(self, text: str):
+        print(f"[ARENA {self.arena_id}] {text}")
+
+    # -- players -------------------------------------------------------------
+
+    def _spawn_position(self):
+        for _ in range(200):
+            x = self.rng.randint(TANK_SIZE, WORLD_WIDTH - TANK_SIZE)
+            y = self.rng.randint(TANK_SIZE, WORLD_HEIGHT - TANK_SIZE)
+            if not _collides_obstacle(x, y, TANK_SIZE):
+                return x, y
+        return WORLD_WIDTH // 2, WORLD_HEIGHT // 2
+
+    def create_new_player(self, pid, existing_uid=None):
+        x, y = self._spawn_position()
+        uid = existing_uid or f"{self.rng.getrandbits(128):032x}"
+        return Player(pid, uid, x, y)
+
+    def _respawn_player(self, player):
+        player.reset(*self._spawn_position())
+        self._clear_traps(player.id)
+
+    def add_player(self) -> int:
+        with self.lock:
+            pid = self.next_player_id
+            self.next_player_id += 1
+            self.players[pid] = self.create_new_player(pid)
+            self.inputs[pid] = {}
+            self.shot_locks[pid] = False
+            self.trap_locks[pid] = False
+            if self.recorder is not None:
+                self.recorder.join(pid)
+        return pid
+
+    def remove_player(self, pid: int):
+        with self.lock:
+            if self.recorder is not None and pid in self.players:
+                self.recorder.leave(pid)
+            self.players.pop(pid, None)
+            self.inputs.pop(pid, None)
+            self.input_seqs.pop(pid, None)
+            self.shot_locks.pop(pid, None)
+            self.trap_locks.pop(pid, None)
+
+    def player_count(self) -> int:
+        """
+        Connected humans; bots do not keep an arena alive.
+        """
+        return len(self.players) - len(self.bots.bots)
+
+    def rebalance_bots(self):
+        """
+        Top the match up with bots while humans are connected, and make
+        room again as more humans join.
+        """
+        with self._rebalance_lock:
+            humans = len(self.conn_players)
+            wanted = max(0, self.bot_fill - humans) if humans else 0
+            while len(self.bots.bots) < wanted:
+                pid = self.bots.add_bot()
+                EVENTS.emit("info", "bot_join", arena=self.arena_id, player=pid)
+            while len(self.bots.bots) > wanted:
+                pid = self.bots.remove_bot()
+                EVENTS.emit("info", "bot_leave", arena=self.arena_id, player=pid)
+
+    def _collect_metrics(self):
+        for kind, count in self.entity_counts().items():
+            ENTITIES.labels(arena=self.arena_id, kind=kind).set(count)
+        if _TIOCOUTQ is None:
+            return
+        for conn, pid in list(self.conn_players.items()):
+            try:
+                queued = struct.unpack("i", fcntl.ioctl(conn.fileno(), _TIOCOUTQ, b"\0\0\0\0"))[0]
+            except (OSError, ValueError):
+                continue
+            SEND_QUEUE.labels(arena=self.arena_id, player=pid).set(queued)
+
+    def _drop_metrics(self):
+        REGISTRY.remove_collector(self._collect_metrics)
+        for metric in (TICK_SECONDS, TICK_OVERRUNS, INPUT_MESSAGES, ENCODE_SECONDS, SNAPSHOT_BYTES,
+                       COMPRESS_SECONDS, COMPRESSED_BYTES):
+            metric.remove(arena=self.arena_id)
+        for metric in (BOT_FIELDS, BOT_SKIPPED):
+            metric.remove(arena=self.arena_id)
+        for kind in self.entity_counts():
+            ENTITIES.remove(arena=self.arena_id, kind=kind)
+
+    def entity_counts(self) -> dict:
+        return {
+            "players": len(self.players),
+            "bullets": len(self.bullets),
+            "traps": len(self.traps),
+            "powerups": len(self.powerups),
+        }
+
+    def handle_client(self, conn, addr, player_id, on_disconnect=None):
+        EVENTS.emit("info", "connect", arena=self.arena_id, player=player_id, addr=f"{addr[0]}:{addr[1]}")
+
+        received = BYTES_RECEIVED.labels(arena=self.arena_id, player=player_id)
+        buffer = ""
+        try:
+            while True:
+                data = conn.recv(1024)
+                if not data:
+                    break
+                received.inc(len(data))
+                buffer += data.decode()
+                while "\n" in buffer:
+                    line, buffer = buffer.split("\n", 1)
+                    if not line.strip():
+                        continue
+                    try:
+                        msg = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+                    if not isinstance(msg, dict):
+                        continue
+                    if msg.get("type") == "input":
+                        self._m_inputs.inc()
+                        keys = msg.get("keys")
+                        if not isinstance(keys, dict):
+                            continue
+                        seq = msg.get("seq")
+                        with self.lock:
+                            self.inputs[player_id] = keys
+                            if _valid_seq(seq):
+                                self.input_seqs[player_id] = seq
+                    elif msg.get("type") == "ping":
+                        self._pong(conn, msg.get("t"))
+        except (ConnectionResetError, OSError):
+            pass
+        finally:
+            EVENTS.emit("info", "disconnect", arena=self.arena_id, player=player_id)
+            self._drop_connection(conn, player_id)
+            if on_disconnect:
+                on_disconnect(self)
+
+    def _drop_connection(self, conn, player_id: int):
+        # undoes join(), however far it got
+        self.remove_player(player_id)
+        try:
+            self.connections.remove(conn)
+        except ValueError:
+            pass
+        self.conn_players.pop(conn, None)
+        self.rebalance_bots()
+        self._drop_encoding(conn)
+        self.conn_views.pop(conn, None)
+        self._sent_metrics.pop(conn, None)
+        with self._outbox_lock:
+            self.outbox.pop(conn, None)
+        for metric in (BYTES_SENT, BYTES_RECEIVED, SEND_QUEUE):
+            metric.remove(arena=self.arena_id, player=player_id)
+        if self.fanout is not None:
+            self.fanout.remove(conn)
+        conn.close()
+
+    def _send_init(self, conn, init_msg: dict, hello: dict = None) -> str:
+        """
+        Send the init line, accepting compression if the hello offered it.
+        Returns the frame encoding to use for this connection. The init goes
+        out before the socket joins `connections`, so it always precedes
+        the first (possibly binary) frame.
+        """
+        encoding = "plain"
+        offered = (hello or {}).get("compression")
+        if not isinstance(offered, (list, tuple)) or not all(isinstance(e, str) for e in offered):
+            offered = ()  # malformed offers are ignored, not trusted
+        if COMPRESSION_ENABLED and compression.ENCODING in offered:
+            encoding = compression.ENCODING
+            init_msg["compression"] = encoding
+            init_msg["zdict"] = compression.encode_dictionary(STATE_ZDICT)
+        conn.sendall((json.dumps(init_msg) + "\n").encode())
+        return encoding
+
+    def join(self, conn, addr, on_disconnect=None, hello=None) -> int:
+        """
+        Adopt a connected socket as a new player and start its reader thread.
+        If anything fails on the way, the player is removed again, the
+        socket closed and the error re-raised.
+        """
+        view = _hello_view(hello)  # the hello is read before the player exists
+        pid = self.add_player()
+        try:
+            player = self.players.get(pid)
+            init_msg = {"type": "init", "player_id": pid, "player_uid": player.uid if player else None}
+            try:
+                encoding = self._send_init(conn, init_msg, hello)
+            except OSError:
+                encoding = "plain"  # the reader thread notices the dead socket and cleans up
+            self.conn_players[conn] = pid
+            self._set_encoding(conn, encoding)
+            self.conn_views[conn] = view
+            self._sent_metrics[conn] = BYTES_SENT.labels(arena=self.arena_id, player=pid)
+            self.connections.append(conn)
+            # per-player AOI frames are sent from the tick thread; the ring only carries shared frames
+            if self.fanout is not None and not self.aoi:
+                self.fanout.add(conn, encoding != "plain")
+            threading.Thread(
+                target=self.handle_client, args=(conn, addr, pid, on_disconnect), daemon=True
+            ).start()
+        except Exception:
+            self._drop_connection(conn, pid)
+            raise
+        self.rebalance_bots()
+        return pid
+
+    def spectate(self, conn, addr, hello=None):
+        """
+        Adopt a connected socket as a watch-only viewer: it gets the same
+        frames as players (usually a relay.py process re-broadcasting them),
+        but has no player and does not keep the arena alive.
+        """
+        init_msg = {"type": "init", "player_id": None, "player_uid": None,
+                    "spectator": True, "arena": self.arena_id}
+        try:
+            encoding = self._send_init(conn, init_msg, hello)
+        except OSError:
+            conn.close()
+            return
+        self._set_encoding(conn, encoding)
+        self.spectators.append(conn)
+        self.connections.append(conn)
+        if self.fanout is not None:
+            self.fanout.add(conn, encoding != "plain")
+        threading.Thread(target=self.handle_spectator, args=(conn, addr), daemon=True).start()
+
+    def _set_encoding(self, conn, encoding: str):
+        with self._encodings_lock:
+            self.conn_encodings[conn] = encoding
+            if encoding == compression.ENCODING:
+                self.compressed_conns += 1
+
+    def _drop_encoding(self, conn):
+        with self._encodings_lock:
+            if self.conn_encodings.pop(conn, None) == compression.ENCODING:
+                self.compressed_conns -= 1
+
+    def queue_line(self, conn, data: bytes) -> bool:
+        """
+        Send `data` (a whole line) to one connection together with its next
+        frame. Only the tick thread writes to a socket once it is in
+        `connections`, so this is how other threads reach a client. False
+        if the connection's frames go out through fan-out workers instead.
+        """
+        if self.fanout is not None and (not self.aoi or conn in self.spectators):
+            return False
+        with self._outbox_lock:
+            self.outbox.setdefault(conn, []).append(data)
+        return True
+
+    def _pong(self, conn, sent):
+        """
+        Answer a ping ahead of the connection's next frame. "rx" is when the
+        ping arrived; the client subtracts the wait until that frame's
+        "time" from the round trip. Connections served by fan-out workers
+        get no pong (their frames still carry the stamps).
+        """
+        line = (json.dumps({"type": "pong", "t": sent, "rx": round(self.clock(), 4)}) + "\n").encode()
+        if self.conn_encodings.get(conn) == compression.ENCODING:
+            line = self.compressor.compress(line)
+        self.queue_line(conn, line)
+
+    def _send_frame(self, conn, frame: bytes) -> bool:
+        # the frame, preceded by any queued lines, in as few system calls as possible
+        if self.outbox:
+            with self._outbox_lock:
+                pending = self.outbox.pop(conn, None)
+            if pending:
+                pending.append(frame)
+                frame = pending
+        try:
+            if isinstance(frame, list):
+                transport.send_frames(conn, frame)
+            else:
+                conn.sendall(frame)
+        except OSError:
+            return False
+        sent = self._sent_metrics.get(conn)
+        if sent is not None:
+            sent.inc(sum(map(len, frame)) if isinstance(frame, list) else len(frame))
+        return True
+
+    def handle_spectator(self, conn, addr):
+        EVENTS.emit("info", "spectate", arena=self.arena_id, addr=f"{addr[0]}:{addr[1]}")
+        try:
+            # nothing a spectator sends is used; read only to notice the disconnect
+            while conn.recv(1024):
+                pass
+        except OSError:
+            pass
+        finally:
+            EVENTS.emit("info", "spectator_left", arena=self.arena_id, addr=f"{addr[0]}:{addr[1]}")
+            for group in (self.spectators, self.connections):
+                try:
+                    group.remove(conn)
+                except ValueError:
+                    pass
+            self._drop_encoding(conn)
+            if self.fanout is not None:
+                self.fanout.remove(conn)
+            conn.close()
+
+    # -- simulation ----------------------------------------------------------
+
+    def _spawn_powerups(self, now: float):
+        if len(self.powerups) >= POWERUP_MAX:
+            return
+        if now - self.last_powerup_spawn < POWERUP_RESPAWN_TIME:
+            return
+        for _ in range(100):
+            px = self.rng.randint(POWERUP_SIZE, WORLD_WIDTH - POWERUP_SIZE)
+            py = self.rng.randint(POWERUP_SIZE, WORLD_HEIGHT - POWERUP_SIZE)
+            if not _collides_obstacle(px, py, POWERUP_SIZE):
+                break
+        else:
+            return
+        ptype = self.rng.choice(["rapid", "heavy", "spread", "bouncy"])
+        self.powerups.append(Powerup(self.next_powerup_id, px, py, ptype))
+        self.next_powerup_id += 1
+        self.last_powerup_spawn = now
+
+    def _clear_traps(self, owner_id: int):
+        # compact in place and hand the records back to the pool
+        traps = self.traps
+        kept = 0
+        for t in traps:
+            if t.owner == owner_id:
+                self.trap_pool.release(t)
+            else:
+                traps[kept] = t
+                kept += 1
+        del traps[kept:]
+
+    def update_game(self, dt):
+        now = self.clock()
+        mark = self.profiler.mark
+
+        with self.lock:
+            self.tick += 1
+            self.bots.think(now)
+            mark("bots")
+            if self.recorder is not None:
+                self.recorder.tick(now, self.inputs, self.input_seqs)
+            self._spawn_powerups(now)
+            mark("powerups")
+            self._expire_weapons(now)
+            mark("weapons")
+            aims = self._move_players()
+            mark("movement")
+            self._player_actions(now, aims)
+            mark("actions")
+            self._integrate_bullets()
+            mark("bullets")
+            self._collide_bullets()
+            mark("bullet_vs_bullet")
+            self._hit_players()
+            mark("bullet_vs_player")
+            self._pickup_powerups(now)
+            mark("pickups")
+            self._trigger_traps()
+            mark("traps")
+            if self.recorder is not None and self.recorder.check_due():
+                self.recorder.check(self.encode_state(now))
+
+    def _expire_weapons(self, now):
+        # expire temporary weapons
+        for player in self.players.values():
+            if player.weapon != "basic" and now > player.weapon_expires:
+                player.weapon = "basic"
+                player.weapon_expires = 0.0
+
+    def _move_players(self):
+        """
+        Apply movement keys and cursor facing. Returns pid -> aim angle
+        (None without a usable cursor) for the actions phase.
+        """
+        items = list(self.players.items())
+        if self.tick_pool is not None:
+            angles = self.tick_pool.map(self._move_player, items)
+        else:
+            angles = [self._move_player(item) for item in items]
+        return {pid: angle for (pid, _), angle in zip(items, angles)}
+
+    def _move_player(self, item):
+        # one tank's movement and facing; touches only that tank
+        pid, player = item
+        keys = self.inputs.get(pid, {})
+        if pid in self.input_seqs:
+            player.ack = self.input_seqs[pid]
+        mouse_pos = keys.get("mouse_pos")
+
+        dx = 0
+        dy = 0
+        if keys.get("up"):
+            dy -= TANK_STEP
+            player.dir = "up"
+        if keys.get("down"):
+            dy += TANK_STEP
+            player.dir = "down"
+        if keys.get("left"):
+            dx -= TANK_STEP
+            player.dir = "left"
+        if keys.get("right"):
+            dx += TANK_STEP
+            player.dir = "right"
+
+        old_x, old_y = player.x, player.y
+        new_x = max(0, min(WORLD_WIDTH - TANK_SIZE, old_x + dx))
+        if not _collides_obstacle(new_x, old_y, TANK_SIZE):
+            player.x = new_x
+        new_y = max(0, min(WORLD_HEIGHT - TANK_SIZE, old_y + dy))
+        if not _collides_obstacle(player.x, new_y, TANK_SIZE):
+            player.y = new_y
+
+        # update facing based on cursor to keep turret following aim
+        aim_angle = None
+        center_x = player.x + TANK_SIZE // 2
+        center_y = player.y + TANK_SIZE // 2
+        if isinstance(mouse_pos, (list, tuple)) and len(mouse_pos) == 2:
+            mx, my = mouse_pos
+            aim_dx = mx - center_x
+            aim_dy = my - center_y
+            if aim_dx != 0 or aim_dy != 0:
+                aim_angle = math.degrees(math.atan2(aim_dy, aim_dx))
+                if abs(aim_dx) > abs(aim_dy):
+                    player.dir = "right" if aim_dx > 0 else "left"
+                else:
+                    player.dir = "down" if aim_dy > 0 else "up"
+        return aim_angle
+
+    def _player_actions(self, now, aims):
+        for pid, player in self.players.items():
+            keys = self.inputs.get(pid, {})
+            center_x = player.x + TANK_SIZE // 2
+            center_y = player.y + TANK_SIZE // 2
+
+            # traps
+            is_trap = keys.get("trap", False)
+            if not self.trap_locks.get(pid, False):
+                self.trap_locks[pid] = False
+            if is_trap and not self.trap_locks[pid]:
+                if player.active_traps < TRAP_MAX_ACTIVE and now >= player.trap_ready_at:
+                    tx = center_x - TRAP_SIZE // 2
+                    ty = center_y - TRAP_SIZE // 2
+                    trap = self.trap_pool.acquire()
+                    trap.place(tx, ty, pid)
+                    self.traps.append(trap)
+                    player.active_traps += 1
+                    player.trap_ready_at = now + TRAP_COOLDOWN
+                self.trap_locks[pid] = True
+            elif not is_trap:
+                self.trap_locks[pid] = False
+
+            # shooting
+            is_shooting = keys.get("shoot", False)
+            if not self.shot_locks.get(pid, False):
+                self.shot_locks[pid] = False
+
+            if is_shooting and not self.shot_locks[pid]:
+                self.shot_locks[pid] = True
+                stats = get_weapon_stats(player.weapon)
+                aim_angle = aims.get(pid)
+                base_angle = aim_angle if aim_angle is not None else {"right": 0, "down": 90, "left": 180, "up": -90}.get(player.dir, -90)
+                count = max(1, stats.get("count", 1))
+                spread = stats.get("spread_deg", 0)
+                for i in range(count):
+                    angle = base_angle
+                    if count > 1:
+                        offset = i - (count - 1) / 2
+                        angle += spread * offset
+                    rad = math.radians(angle)
+                    speed = stats.get("speed", BULLET_SPEED)
+                    b = self.bullet_pool.acquire()
+                    b.x = center_x
+                    b.y = center_y
+                    b.dx = math.cos(rad) * speed
+                    b.dy = math.sin(rad) * speed
+                    b.owner = pid
+                    b.dmg = stats.get("damage", 1)
+                    b.bounces = stats.get("bounces", 0)
+                    self.bullets.append(b)
+            elif not is_shooting:
+                self.shot_locks[pid] = False
+
+    def _advance_bullet(self, b) -> bool:
+        """
+        Sweep one bullet through this tick's step. It stops in the first
+        tank it enters (b.target, for _hit_players) and reflects off walls
+        at the exact point of contact while it has bounces left, as often
+        as the step needs. Only writes `b`. False when a wall stops it.
+        """
+        b.target = None
+        x, y = b.x, b.y
+        dx, dy = b.dx * STEP_SCALE, b.dy * STEP_SCALE  # rest of this step
+        half_tank = TANK_SIZE / 2  # tank_index holds centres
+        while True:
+            end_x, end_y = x + dx, y + dy
+
+            # earliest wall on the segment (world edge or obstacle) and the
+            # coordinates of the side(s) it meets, to place the contact exactly
+            s_wall = math.inf
+            wall_x = wall_y = None
+            if end_x < 0 or end_x > WORLD_WIDTH:
+                wall_x = 0 if end_x < 0 else WORLD_WIDTH
+                s_wall = max(0.0, (wall_x - x) / dx) if dx else 0.0
+            if end_y < 0 or end_y > WORLD_HEIGHT:
+                edge = 0 if end_y < 0 else WORLD_HEIGHT
+                s = max(0.0, (edge - y) / dy) if dy else 0.0
+                if s < s_wall:
+                    s_wall, wall_x = s, None
+                if s == s_wall:
+                    wall_y = edge
+            lo_x, hi_x = (x, end_x) if dx >= 0 else (end_x, x)
+            lo_y, hi_y = (y, end_y) if dy >= 0 else (end_y, y)
+            for box in _SOLIDS.query(lo_x, lo_y, hi_x, hi_y):
+                hit = _segment_entry(x, y, dx, dy, *box)
+                if hit is None or hit[0] >= s_wall:
+                    continue
+                if hit[0] < 0:
+                    return False  # started inside a wall
+                s_wall = hit[0]
+                wall_x = (box[0] if dx > 0 else box[2]) if hit[1] else None
+                wall_y = (box[1] if dy > 0 else box[3]) if hit[2] else None
+
+            # a tank entered no later than that wall takes the bullet (join order breaks ties)
+            target = None
+            s_tank = s_wall
+            order = 0
+            for i, pid, p in self.tank_index.query(lo_x - half_tank, lo_y - half_tank,
+                                                   hi_x + half_tank, hi_y + half_tank):
+                if pid == b.owner:
+                    continue
+                hit = _segment_entry(x, y, dx, dy, p.x, p.y, p.x + TANK_SIZE, p.y + TANK_SIZE)
+                if hit is None:
+                    continue
+                s = max(0.0, hit[0])
+                if s < s_tank or (s == s_tank and (target is None or i < order)):
+                    s_tank, target, order = s, p, i
+            if target is not None:
+                b.target = target
+                b.x, b.y = x + dx * s_tank, y + dy * s_tank
+                return True
+
+            if s_wall == math.inf:
+                b.x, b.y = end_x, end_y
+                return True
+            if b.bounces <= 0:
+                return False
+            # reflect at the contact point; the rest of the step continues mirrored
+            rest = 1 - s_wall
+            x = wall_x if wall_x is not None else x + dx * s_wall
+            y = wall_y if wall_y is not None else y + dy * s_wall
+            dx, dy = dx * rest, dy * rest
+            if wall_x is not None:
+                dx, b.dx = -dx, -b.dx
+            if wall_y is not None:
+                dy, b.dy = -dy, -b.dy
+            b.bounces -= 1
+
+    def _integrate_bullets(self):
+        # move bullets (compacted in place; dead bullets go back to the pool)
+        bullets = self.bullets
+        index = self.tank_index
+        index.clear()
+        if bullets:
+            half_tank = TANK_SIZE / 2
+            for i, (pid, p) in enumerate(self.players.items()):
+                index.insert(p.x + half_tank, p.y + half_tank, (i, pid, p))
+        alive = self.tick_pool.map(self._advance_bullet, bullets) if self.tick_pool is not None else None
+        kept = 0
+        for i, b in enumerate(bullets):
+            if not (alive[i] if alive is not None else self._advance_bullet(b)):
+                self.bullet_pool.release(b)
+                continue
+            bullets[kept] = b
+            kept += 1
+        del bullets[kept:]
+
+    def _collide_bullets(self):
+        # bullet vs bullet collisions (remove both on hit, only if different owners);
+        # pairs come from the grid, so only nearby bullets are compared
+        bullets = self.bullets
+        if len(bullets) < 2:
+            return
+        index = self.bullet_index
+        index.clear()
+        for i, b in enumerate(bullets):
+            index.insert(b.x, b.y, i)
+        order = range(len(bullets))
+        contacts = self.tick_pool.map(self._bullet_contacts, order) if self.tick_pool is not None else None
+        to_remove = set()
+        for i in order:
+            if i in to_remove:
+                continue
+            for j in (contacts[i] if contacts is not None else self._bullet_contacts(i)):
+                if j not in to_remove:
+                    to_remove.add(i)
+                    to_remove.add(j)
+        if not to_remove:
+            return
+        kept = 0
+        for idx, b in enumerate(bullets):
+            if idx in to_remove:
+                b.target = None  # pooled bullets hold no Player
+                self.bullet_pool.release(b)
+            else:
+                bullets[kept] = b
+                kept += 1
+        del bullets[kept:]
+
+    def _bullet_contacts(self, i) -> list:
+        """
+        Later bullets (index > i, other owner) overlapping bullet i. Only
+        reads the bullets and the grid filled by _collide_bullets.
+        """
+        bullets = self.bullets
+        b = bullets[i]
+        x1, y1, _, _ = _bullet_rect(b)
+        reach = BULLET_SIZE + 1  # the exact test below decides; the query only must not miss
+        out = []
+        for j in self.bullet_index.query(b.x - reach, b.y - reach, b.x + reach, b.y + reach):
+            if j <= i or bullets[j].owner == b.owner:
+                continue
+            x2, y2, _, _ = _bullet_rect(bullets[j])
+            if _rect_hit(x1, y1, BULLET_SIZE, x2, y2, BULLET_SIZE):
+                out.append(j)
+        return out
+
+    def _hit_players(self):
+        # targets were found by the sweep in _advance_bullet
+        bullets = self.bullets
+        respawned = set()
+        kept = 0
+        for b in bullets:
+            p = b.target
+            b.target = None  # read once; pooled or not, no Player is kept past the tick
+            if p is None or p.id in respawned:
+                # a tank that respawned this tick has left the bullet's path;
+                # the bullet goes on from where it stopped
+                bullets[kept] = b
+                kept += 1
+                continue
+            pid = p.id
+            p.hp -= b.dmg
+            EVENTS.emit("debug", "hit", arena=self.arena_id, player=pid, by=b.owner, hp=p.hp)
+            if p.hp <= 0:
+                EVENTS.emit("info", "death", arena=self.arena_id, player=pid, by=b.owner, cause="bullet")
+                self._respawn_player(p)
+                respawned.add(pid)
+            self.bullet_pool.release(b)
+        del bullets[kept:]
+
+    def _pickup_powerups(self, now):
+        powerups = self.powerups
+        kept = 0
+        for p in powerups:
+            claimed = False
+            for pid, player in self.players.items():
+                if _rect_hit(player.x, player.y, TANK_SIZE, p.x, p.y, POWERUP_SIZE):
+                    player.weapon = p.type
+                    player.weapon_expires = now + POWERUP_DURATION
+                    EVENTS.emit("debug", "pickup", arena=self.arena_id, player=pid, weapon=p.type)
+                    claimed = True
+                    break
+            if not claimed:
+                powerups[kept] = p
+                kept += 1
+        del powerups[kept:]
+
+    def _trigger_traps(self):
+        # trap hits; respawned owners' traps are cleared after the sweep
+        traps = self.traps
+        kept = 0
+        respawned = []
+        for t in traps:
+            triggered = False
+            for pid, player in self.players.items():
+                if pid == t.owner:
+                    continue
+                if _rect_hit(player.x, player.y, TANK_SIZE, t.x, t.y, TRAP_SIZE):
+                    player.hp -= TRAP_DAMAGE
+                    EVENTS.emit("info", "trap", arena=self.arena_id, player=pid, by=t.owner, hp=player.hp)
+                    if player.hp <= 0:
+                        EVENTS.emit("info", "death", arena=self.arena_id, player=pid, by=t.owner, cause="trap")
+                        player.reset(*self._spawn_position())
+                        respawned.append(pid)
+                    owner = self.players.get(t.owner)
+                    if owner:
+                        owner.active_traps = max(0, owner.active_traps - 1)
+                    triggered = True
+                    break
+            if triggered:
+                self.trap_pool.release(t)
+            else:
+                traps[kept] = t
+                kept += 1
+        del traps[kept:]
+        for pid in respawned:
+            self._clear_traps(pid)
+
+    def state_head(self, now: float) -> str:
+        """
+        Opening of a state frame stamped with the tick number and server
+        time, so clients can spot dropped frames and measure jitter.
+        """
+        return '{"type":"state","tick":%d,"time":%.4f,' % (self.tick, now)
+
+    def encode_state(self, now: float, head: str = STATE_HEAD) -> bytes:
+        """
+        Serialize the world straight from the entity records; no intermediate
+        per-player dicts or bullet copies. Call with `lock` held.
+        """
+        return (
+            head + '"players":{'
+            + ",".join([p.to_json(now) for p in self.players.values()])
+            + '},"bullets":['
+            + ",".join([b.to_json() for b in self.bullets])
+            + '],"powerups":['
+            + ",".join([p.to_json() for p in self.powerups])
+            + '],"traps":['
+            + ",".join([t.to_json() for t in self.traps])
+            + ']}\n'
+        ).encode()
+
+    def index_state(self, now: float) -> dict:
+        """
+        Encode every entity once and bucket the fragments by position in
+        the spatial index, for encode_view. Returns pid -> (x, y) of the
+        players. Call with `lock` held.
+        """
+        index = self.aoi_index
+        index.clear()
+        half_tank = TANK_SIZE / 2
+        half_powerup = POWERUP_SIZE / 2
+        half_trap = TRAP_SIZE / 2
+        positions = {}
+        for pid, p in self.players.items():
+            index.insert(p.x + half_tank, p.y + half_tank, (0, p.to_json(now)))
+            positions[pid] = (p.x, p.y)
+        for b in self.bullets:
+            index.insert(b.x, b.y, (1, b.to_json()))
+        for p in self.powerups:
+            index.insert(p.x + half_powerup, p.y + half_powerup, (2, p.to_json()))
+        for t in self.traps:
+            index.insert(t.x + half_trap, t.y + half_trap, (3, t.to_json()))
+        return positions
+
+    def view_rect(self, pos, view=DEFAULT_VIEW):
+        """
+        Area of interest of a player at `pos` (its top-left corner) with a
+        `view`-sized window: what that client's camera shows, plus AOI_MARGIN.
+        """
+        vw, vh = view
+        x, y = view_origin(pos[0] + TANK_SIZE / 2, pos[1] + TANK_SIZE / 2, vw, vh, WORLD_WIDTH, WORLD_HEIGHT)
+        return x - AOI_MARGIN, y - AOI_MARGIN, x + vw + AOI_MARGIN, y + vh + AOI_MARGIN
+
+    def encode_view(self, rect, head: str = STATE_HEAD) -> bytes:
+        """
+        A state frame with only the indexed entities inside `rect`. Reads
+        the index built by index_state, not the live world, so no lock is
+        needed.
+        """
+        parts = ([], [], [], [])
+        for kind, text in self.aoi_index.query(*rect):
+            parts[kind].append(text)
+        return (
+            head + '"players":{'
+            + ",".join(parts[0])
+            + '},"bullets":['
+            + ",".join(parts[1])
+            + '],"powerups":['
+            + ",".join(parts[2])
+            + '],"traps":['
+            + ",".join(parts[3])
+            + ']}\n'
+        ).encode()
+
+    def broadcast_state(self):
+        if self.aoi:
+            self._broadcast_views()
+            return
+        t0 = time.perf_counter()
+        with self.lock:
+            now = self.clock()
+            data = self.encode_state(now, self.state_head(now))
+        self._m_encode.observe(time.perf_counter() - t0)
+        self._m_snapshot_bytes.observe(len(data))
+        self.profiler.mark("encode")
+
+        # compressed once per tick and shared by every client that negotiated it
+        frames = {"plain": data}
+        if self.compressed_conns:
+            t0 = time.perf_counter()
+            packed = self.compressor.compress(data)
+            self._m_compress.observe(time.perf_counter() - t0)
+            self._m_compressed_bytes.observe(len(packed))
+            frames[compression.ENCODING] = packed
+            self.profiler.mark("compress")
+
+        # fan-out workers send it; frames too big for the ring go out from here
+        if self.fanout is not None and self.fanout.publish(data, frames.get(compression.ENCODING)):
+            for conn, sent in list(self._sent_metrics.items()):
+                sent.inc(len(frames.get(self.conn_encodings.get(conn), data)))
+            self.profiler.mark("send")
+            return
+
+        for conn in list(self.connections):
+            self._send_frame(conn, frames.get(self.conn_encodings.get(conn), data))
+        self.profiler.mark("send")
+
+    def _broadcast_views(self):
+        """
+        broadcast_state for AOI arenas: one frame per player, assembled
+        from entity fragments encoded once per tick. Spectators still get
+        the whole world, encoded (and compressed) once and shared.
+        """
+        t0 = time.perf_counter()
+        with self.lock:
+            now = self.clock()
+            head = self.state_head(now)
+            positions = self.index_state(now)
+            world = self.encode_state(now, head) if self.spectators else None
+        frames = {}  # conn -> frame
+        for conn, pid in list(self.conn_players.items()):
+            pos = positions.get(pid)
+            if pos is not None:
+                frames[conn] = self.encode_view(self.view_rect(pos, self.conn_views.get(conn, DEFAULT_VIEW)), head)
+        self._m_encode.observe(time.perf_counter() - t0)
+        for data in frames.values():
+            self._m_snapshot_bytes.observe(len(data))
+        self.profiler.mark("encode")
+
+        spectator_frames = {"plain": world}
+        if self.compressed_conns:
+            t0 = time.perf_counter()
+            for conn, data in frames.items():
+                if self.conn_encodings.get(conn) == compression.ENCODING:
+                    frames[conn] = packed = self.compressor.compress(data)
+                    self._m_compressed_bytes.observe(len(packed))
+            if world is not None and any(self.conn_encodings.get(c) == compression.ENCODING
+                                         for c in list(self.spectators)):
+                spectator_frames[compression.ENCODING] = self.compressor.compress(world)
+            self._m_compress.observe(time.perf_counter() - t0)
+            self.profiler.mark("compress")
+
+        # in AOI mode only spectators are registered with the fan-out workers
+        if world is not None and not (self.fanout is not None
+                                      and self.fanout.publish(world, spectator_frames.get(compression.ENCODING))):
+            for conn in list(self.spectators):
+                frames[conn] = spectator_frames.get(self.conn_encodings.get(conn), world)
+
+        for conn, frame in frames.items():
+            self._send_frame(conn, frame)
+        self.profiler.mark("send")
+
+    def run(self):
+        """
+        Tick loop; returns once stop_event is set.
+        """
+        tick_delay = 1.0 / SERVER_TICK_RATE
+        last_time = time.time()
+        # ticks run on a fixed schedule: movement per tick assumes the nominal
+        # rate (STEP_SCALE), so sleeping a full tick_delay after the work would
+        # slow the whole game down by however long each tick takes
+        next_tick = time.perf_counter()
+
+        while not self.stop_event.is_set():
+            now = time.time()
+            dt = now - last_time
+            last_time = now
+
+            self.profile_trigger.poll(self.profiler)
+            self.profiler.begin_tick()
+            self.update_game(dt)
+            self.broadcast_state()
+            self.profiler.end_tick(self.entity_counts())
+            self._m_tick.observe(self.profiler.last_tick_ms / 1000.0)
+            if self.profiler.last_tick_ms > self.profiler.budget_ms:
+                self._m_overruns.inc()
+
+            next_tick += tick_delay
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -MAX_CATCH_UP_TICKS * tick_delay:
+                next_tick = time.perf_counter()  # after a stall, carry on at normal speed
+
+        self.profiler.cancel_profile()
+        self._drop_metrics()
+        for conn in list(self.spectators):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.fanout is not None:
+            self.fanout.close()
+        if self.recorder is not None:
+            self.recorder.close()
+            self._log(f"Recorded {self.recorder.ticks} ticks to {self.recorder.path} "
+                      f"({self.recorder.bytes_written} bytes)")
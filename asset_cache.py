@@ -0,0 +1,102 @@
+# asset_cache.py
+"""
+Startup caches for the LAN Tanks client.
+
+- Resolved system font paths (skips the slow system font scan)
+- Pre-scaled background images stored next to the assets
+- Both live in assets/.cache and are rebuilt automatically when stale
+"""
+
+import json
+import os
+
+import pygame
+
+CACHE_DIR = os.path.join("assets", ".cache")
+FONT_CACHE_FILE = os.path.join(CACHE_DIR, "fonts.json")
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    # Cache writes are best effort: a read-only install just runs uncached.
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _resolve_font(name: str, bold: bool):
+    """
+    Return (path, fake_bold) for a system font, the way SysFont would pick it.
+    path is None when the font is missing and pygame's default font is used.
+    """
+    path = pygame.font.match_font(name, bold=bold)
+    if path is None:
+        return None, bold
+    fake_bold = bold and path == pygame.font.match_font(name)
+    return path, fake_bold
+
+
+def load_font(name: str, size: int, bold: bool = False) -> pygame.font.Font:
+    """
+    Drop-in replacement for pygame.font.SysFont that remembers where the
+    font lives, so later launches skip the system font enumeration.
+    """
+    cache = _read_json(FONT_CACHE_FILE) or {}
+    key = f"{name}|{'bold' if bold else 'regular'}"
+    entry = cache.get(key)
+
+    if entry is None or (entry["path"] is not None and not os.path.exists(entry["path"])):
+        path, fake_bold = _resolve_font(name, bold)
+        entry = {"path": path, "fake_bold": fake_bold}
+        cache[key] = entry
+        _write_json(FONT_CACHE_FILE, cache)
+
+    font = pygame.font.Font(entry["path"], size)
+    if entry["fake_bold"]:
+        font.set_bold(True)
+    return font
+
+
+def load_scaled_image(path: str, size) -> pygame.Surface:
+    """
+    Load an opaque image scaled to `size`, reusing a pre-scaled copy from
+    the cache when the source file's mtime and size have not changed.
+    Requires the display to be initialised (for convert()).
+    """
+    st = os.stat(path)
+    width, height = size
+    base = os.path.splitext(os.path.basename(path))[0]
+    cached_img = os.path.join(CACHE_DIR, f"{base}_{width}x{height}.bmp")
+    meta_path = cached_img + ".json"
+    stamp = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+    if _read_json(meta_path) == stamp:
+        try:
+            # uncompressed BMP: no PNG decode and no rescale on the hot path
+            return pygame.image.load(cached_img).convert()
+        except (pygame.error, OSError):
+            pass
+
+    image = pygame.image.load(path).convert()
+    if image.get_size() != (width, height):
+        image = pygame.transform.scale(image, (width, height))
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        pygame.image.save(image, cached_img)
+        _write_json(meta_path, stamp)
+    except (pygame.error, OSError):
+        pass
+    return image
@@ -0,0 +1,338 @@
+# bench.py
+"""
+Microbenchmarks for the server simulation, without sockets.
+
+- Drives Arena.update_game and Arena.encode_state directly
+- Seeded RNG and a fake clock, so every run simulates the same match;
+  bots think without their wall-clock budget (which would make the match
+  depend on machine speed), so bot scenarios time their full cost
+- Reports per-tick time distributions, GC activity and allocation peaks
+- Measures the shared per-tick frame compression (cost and ratio)
+- On maps larger than the screen, also the per-player area-of-interest
+  frames (time for all of them, mean size)
+- --threads N runs the ticks on a parallel_tick.TickPool; the final
+  state checksum is stored, so --compare against a serial run also
+  proves the parallel tick ends in the same state
+- Writes machine-readable JSON and can compare against a previous run
+
+Usage:
+    python bench.py                          # all scenarios
+    python bench.py players_64 bullets_1k    # selected scenarios
+    python bench.py --json out.json --compare baseline.json
+    python bench.py --threads 4 --compare serial.json   # on a free-threaded build
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+import zlib
+
+from game_config import WORLD_WIDTH, WORLD_HEIGHT, SERVER_TICK_RATE, TRAP_SIZE, COMPRESSION_LEVEL, POWERUP_DURATION
+from arena import Arena, STATE_ZDICT, _bullet_hits_solid, get_weapon_stats
+from compression import FrameCompressor
+from event_log import EVENTS, LEVELS
+from parallel_tick import TickPool, free_threading
+
+TICK_BUDGET_MS = 1000.0 / SERVER_TICK_RATE
+DIRECTIONS = ("up", "down", "left", "right")
+
+# name -> setup; "ticks" caps the run for scenarios that are slow by design
+SCENARIOS = {
+    "players_2": {"players": 2},
+    "players_16": {"players": 16},
+    "players_64": {"players": 64},
+    "players_256": {"players": 256, "ticks": 120},
+    "bullets_100": {"players": 8, "bullets": 100},
+    "bullets_1k": {"players": 8, "bullets": 1000, "ticks": 60},
+    "bullets_10k": {"players": 8, "bullets": 10000, "ticks": 2},
+    "bounce_heavy": {"players": 32, "weapon": "bouncy", "shoot_every": 2},
+    "spread_heavy": {"players": 32, "weapon": "spread", "shoot_every": 2},
+    "trap_dense": {"players": 64, "traps": 400},
+    "bots_8": {"players": 0, "bots": 8},
+    "bots_32": {"players": 0, "bots": 32},
+}
+
+
+class FakeClock:
+    """
+    Injectable clock: advances by exactly one tick per call to advance().
+    """
+
+    def __init__(self, start: float = 1_000_000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, dt: float):
+        self.now += dt
+
+
+class InputDriver:
+    """
+    Deterministic stand-in for human players: wanders, re-aims, and taps
+    shoot/trap on a fixed cadence. Players still holding the scenario's
+    `weapon` get its timer topped up every tick, so they keep it until
+    they respawn while frames carry a timer a real server would send.
+    """
+
+    def __init__(self, rng, shoot_every: int = 6, trap_every: int = 0, weapon: str = None):
+        self.rng = rng
+        self.shoot_every = shoot_every
+        self.trap_every = trap_every
+        self.weapon = weapon
+
+    def step(self, arena: Arena, tick: int):
+        rng = self.rng
+        if self.weapon:
+            expires = arena.clock() + POWERUP_DURATION
+            for p in arena.players.values():
+                if p.weapon == self.weapon:
+                    p.weapon_expires = expires
+        for pid, keys in arena.inputs.items():
+            if pid in arena.bots.bots:
+                continue
+            if not keys or rng.random() < 0.05:
+                keys.clear()
+                keys[rng.choice(DIRECTIONS)] = True
+                keys["mouse_pos"] = (rng.randint(0, WORLD_WIDTH), rng.randint(0, WORLD_HEIGHT))
+            keys["shoot"] = self.shoot_every > 0 and (tick + pid) % self.shoot_every == 0
+            keys["trap"] = self.trap_every > 0 and (tick + pid) % self.trap_every == 0
+
+
+def _random_free_point(rng):
+    while True:
+        x = rng.uniform(0, WORLD_WIDTH)
+        y = rng.uniform(0, WORLD_HEIGHT)
+        if not _bullet_hits_solid(x, y):
+            return x, y
+
+
+def build_arena(spec: dict, seed: int, tick_pool=None):
+    rng = random.Random(seed)
+    clock = FakeClock()
+    arena = Arena(0, rng=random.Random(seed), clock=clock, tick_pool=tick_pool)
+    for _ in range(spec.get("players", 2)):
+        arena.add_player()
+    for _ in range(spec.get("bots", 0)):
+        arena.bots.add_bot()
+    arena.bots.budget = math.inf  # every bot thinks every tick, however long it takes
+    pids = list(arena.players)
+
+    weapon = spec.get("weapon")
+    if weapon:
+        for p in arena.players.values():
+            p.weapon = weapon
+            p.weapon_expires = clock() + POWERUP_DURATION
+
+    for _ in range(spec.get("bullets", 0)):
+        b = arena.bullet_pool.acquire()
+        b.x, b.y = _random_free_point(rng)
+        angle = rng.uniform(0, 2 * math.pi)
+        stats = get_weapon_stats(weapon or "basic")
+        b.dx = math.cos(angle) * stats["speed"]
+        b.dy = math.sin(angle) * stats["speed"]
+        b.owner = rng.choice(pids)
+        b.dmg = stats["damage"]
+        b.bounces = stats.get("bounces", 0)
+        arena.bullets.append(b)
+
+    for _ in range(spec.get("traps", 0)):
+        t = arena.trap_pool.acquire()
+        x, y = _random_free_point(rng)
+        t.place(int(x) - TRAP_SIZE // 2, int(y) - TRAP_SIZE // 2, rng.choice(pids))
+        arena.traps.append(t)
+
+    driver = InputDriver(random.Random(seed + 1), shoot_every=spec.get("shoot_every", 6), weapon=weapon)
+    return arena, clock, driver
+
+
+def _distribution(samples_ms):
+    s = sorted(samples_ms)
+    n = len(s)
+
+    def pct(p):
+        return s[min(n - 1, int(round(p / 100.0 * (n - 1))))]
+
+    return {
+        "mean": round(sum(s) / n, 4),
+        "p50": round(pct(50), 4),
+        "p90": round(pct(90), 4),
+        "p99": round(pct(99), 4),
+        "max": round(s[-1], 4),
+    }
+
+
+def run_scenario(name: str, spec: dict, ticks: int, seed: int, tick_pool=None):
+    ticks = min(ticks, spec.get("ticks", ticks))
+    dt = 1.0 / SERVER_TICK_RATE
+
+    # pass 1: timing
+    arena, clock, driver = build_arena(spec, seed, tick_pool)
+    compressor = FrameCompressor(STATE_ZDICT, COMPRESSION_LEVEL)
+    update_ms, encode_ms, compress_ms, frame_bytes, packed_bytes, live_bullets = [], [], [], [], [], []
+    view_ms, view_bytes = [], []
+    gc_before = [g["collections"] for g in gc.get_stats()]
+    blocks_before = sys.getallocatedblocks()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for tick in range(ticks):
+            driver.step(arena, tick)
+            t0 = time.perf_counter()
+            arena.update_game(dt)
+            t1 = time.perf_counter()
+            data = arena.encode_state(clock())
+            t2 = time.perf_counter()
+            packed = compressor.compress(data)
+            t3 = time.perf_counter()
+            if arena.aoi:
+                positions = arena.index_state(clock())
+                for pos in positions.values():
+                    view_bytes.append(len(arena.encode_view(arena.view_rect(pos))))
+                view_ms.append((time.perf_counter() - t3) * 1000.0)
+            clock.advance(dt)
+            update_ms.append((t1 - t0) * 1000.0)
+            encode_ms.append((t2 - t1) * 1000.0)
+            compress_ms.append((t3 - t2) * 1000.0)
+            frame_bytes.append(len(data))
+            packed_bytes.append(len(packed))
+            live_bullets.append(len(arena.bullets))
+    gc_after = [g["collections"] for g in gc.get_stats()]
+    blocks_after = sys.getallocatedblocks()
+    state_crc = zlib.crc32(arena.encode_state(clock()))
+
+    # pass 2: allocation peaks per tick (tracemalloc skews timing, so it runs separately)
+    arena, clock, driver = build_arena(spec, seed, tick_pool)
+    alloc_ticks = min(ticks, 30)
+    peaks = []
+    tracemalloc.start()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for tick in range(alloc_ticks):
+            driver.step(arena, tick)
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            arena.update_game(dt)
+            arena.encode_state(clock())
+            clock.advance(dt)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - base)
+    tracemalloc.stop()
+
+    total_ms = [u + e for u, e in zip(update_ms, encode_ms)]
+    return {
+        "scenario": name,
+        "spec": spec,
+        "ticks": ticks,
+        "players": len(arena.players),
+        "bullets_mean": round(sum(live_bullets) / ticks, 1),
+        "update_ms": _distribution(update_ms),
+        "encode_ms": _distribution(encode_ms),
+        "compress_ms": _distribution(compress_ms),
+        "tick_ms": _distribution(total_ms),
+        "over_budget_ticks": sum(1 for t in total_ms if t > TICK_BUDGET_MS),
+        "frame_bytes_mean": round(sum(frame_bytes) / ticks),
+        "compressed_bytes_mean": round(sum(packed_bytes) / ticks),
+        "compression_ratio": round(sum(frame_bytes) / sum(packed_bytes), 2),
+        "view_ms": _distribution(view_ms) if view_ms else None,
+        "view_bytes_mean": round(sum(view_bytes) / len(view_bytes)) if view_bytes else None,
+        "alloc_peak_bytes_per_tick": round(sum(peaks) / len(peaks)),
+        "net_blocks_per_tick": round((blocks_after - blocks_before) / ticks, 2),
+        "gc_collections": [a - b for a, b in zip(gc_after, gc_before)],
+        "state_crc": state_crc,
+    }
+
+
+def compare(results, baseline_path: str, threshold: float):
+    """
+    Print scenarios whose mean tick time regressed by more than threshold
+    against a previous JSON run, or that ended in a different state than
+    the same run did there. Returns the number of regressions.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    regressions = 0
+    for r in results:
+        old = baseline.get(r["scenario"])
+        if not old:
+            continue
+        if (old.get("state_crc") is not None and old["spec"] == r["spec"] and old["ticks"] == r["ticks"]
+                and old.get("seed") == r.get("seed") and old["state_crc"] != r["state_crc"]):
+            regressions += 1
+            print(f"[BENCH] STATE MISMATCH {r['scenario']}: simulation diverged from the baseline run")
+        for key in ("update_ms", "encode_ms", "compress_ms", "view_ms"):
+            if not old.get(key) or not r.get(key):
+                continue
+            before, after = old[key]["mean"], r[key]["mean"]
+            if before > 0 and (after - before) / before > threshold:
+                regressions += 1
+                print(f"[BENCH] REGRESSION {r['scenario']} {key}: {before:.3f} -> {after:.3f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server simulation microbenchmarks")
+    parser.add_argument("scenarios", nargs="*", help=f"subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="previous --json output to check against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown (0.15 = 15%%)")
+    parser.add_argument("--threads", type=int, default=0, help="run ticks on a pool of this many threads")
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    # game events are not part of what is measured; keep the writer thread idle
+    EVENTS.min_level = LEVELS["error"] + 1
+
+    tick_pool = None
+    if args.threads > 1:
+        tick_pool = TickPool(args.threads)
+        if not free_threading():
+            print(f"[BENCH] GIL enabled: {args.threads} threads check determinism but will not run faster")
+
+    results = []
+    print(f"{'scenario':<14} {'ticks':>5} {'bullets':>8} {'update p50/p99 ms':>18} "
+          f"{'encode p50/p99 ms':>18} {'over':>5} {'frame B':>8} {'zip ms':>7} {'ratio':>6} {'view B':>7} "
+          f"{'peak KiB':>9}")
+    for name in names:
+        r = run_scenario(name, SCENARIOS[name], args.ticks, args.seed, tick_pool)
+        r["seed"] = args.seed
+        results.append(r)
+        print(f"{name:<14} {r['ticks']:>5} {r['bullets_mean']:>8} "
+              f"{r['update_ms']['p50']:>8.3f}/{r['update_ms']['p99']:<9.3f} "
+              f"{r['encode_ms']['p50']:>8.3f}/{r['encode_ms']['p99']:<9.3f} "
+              f"{r['over_budget_ticks']:>5} {r['frame_bytes_mean']:>8} "
+              f"{r['compress_ms']['mean']:>7.3f} {r['compression_ratio']:>6.2f} "
+              f"{r['view_bytes_mean'] if r['view_bytes_mean'] is not None else '-':>7} "
+              f"{r['alloc_peak_bytes_per_tick'] / 1024:>9.1f}")
+
+    if args.json:
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "seed": args.seed,
+            "threads": args.threads,
+            "free_threading": free_threading(),
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[BENCH] saved {args.json}")
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
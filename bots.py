@@ -0,0 +1,347 @@
+# bots.py
+"""
+Server-side AI tanks for LAN Tanks.
+
+- The static map is rasterized once into a walkability grid
+- Flow fields (BFS distance to a target) are shared by every bot in the
+  process and cached by target cell, so a field is only rebuilt when its
+  target moves into a cell that has no cached field yet
+- Bots write the same input dicts human clients send into Arena.inputs,
+  so movement, shooting, recording and replay treat them like players
+- Thinking runs under a hard per-tick time budget: bots that do not fit
+  keep last tick's input, and a field is only built if it fits too
+"""
+
+import collections
+import math
+import random
+import threading
+import time
+
+from game_config import WORLD_WIDTH, WORLD_HEIGHT, TANK_SIZE, OBSTACLES
+from metrics import REGISTRY
+
+CELL = TANK_SIZE // 2
+TARGET_SNAP = 3           # enemy targets are snapped to 3x3-cell blocks so small moves reuse a field
+UNREACHABLE = 1 << 30
+
+AIM_JITTER = 24           # px of random aim error
+ENGAGE_RANGE = 420        # px: start shooting when the enemy is this close and visible
+HOLD_RANGE = 220          # px: stop closing in past this distance
+POWERUP_DETOUR = 30       # cells: grab a powerup if it is at most this much further than the enemy
+FIRE_INTERVAL = 0.45      # seconds between shots
+TRAP_RANGE = 140          # px
+TRAP_CHANCE = 0.02        # per think while an enemy is that close
+
+BOT_FIELDS = REGISTRY.counter("tanks_bot_flow_fields_total", "Flow fields built for an arena's bots (cache misses)", ["arena"])
+BOT_SKIPPED = REGISTRY.counter("tanks_bot_thinks_skipped_total", "Bot updates deferred by the tick budget", ["arena"])
+
+
+def _overlaps_obstacle(x, y, w, h):
+    for ob in OBSTACLES:
+        if x < ob["x"] + ob["w"] and x + w > ob["x"] and y < ob["y"] + ob["h"] and y + h > ob["y"]:
+            return True
+    return False
+
+
+class FlowGrid:
+    """
+    Walkability of CELL-sized cells for a tank's top-left corner. A cell is
+    walkable when the tank fits at every position inside it, so following
+    walkable cells never runs into a wall.
+    """
+
+    _shared = None
+
+    def __init__(self):
+        self.cols = (WORLD_WIDTH - TANK_SIZE) // CELL + 1
+        self.rows = (WORLD_HEIGHT - TANK_SIZE) // CELL + 1
+        self.walkable = [False] * (self.cols * self.rows)
+        for cy in range(self.rows):
+            for cx in range(self.cols):
+                x0, y0 = cx * CELL, cy * CELL
+                w = min(x0 + CELL - 1, WORLD_WIDTH - TANK_SIZE) - x0 + TANK_SIZE
+                h = min(y0 + CELL - 1, WORLD_HEIGHT - TANK_SIZE) - y0 + TANK_SIZE
+                self.walkable[cy * self.cols + cx] = not _overlaps_obstacle(x0, y0, w, h)
+        self.neighbors = [self._neighbors(i) if self.walkable[i] else () for i in range(len(self.walkable))]
+
+    @classmethod
+    def shared(cls):
+        # the map is static, so one grid serves every arena in the process
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def _neighbors(self, i):
+        cx, cy = i % self.cols, i // self.cols
+        out = []
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            nx, ny = cx + dx, cy + dy
+            if 0 <= nx < self.cols and 0 <= ny < self.rows and self.walkable[ny * self.cols + nx]:
+                out.append(ny * self.cols + nx)
+        return tuple(out)
+
+    def cell_of(self, x, y) -> int:
+        cx = min(self.cols - 1, max(0, int(x) // CELL))
+        cy = min(self.rows - 1, max(0, int(y) // CELL))
+        return cy * self.cols + cx
+
+    def snap(self, i, block: int = TARGET_SNAP) -> int:
+        """
+        Representative cell of i's block (its centre when walkable), used
+        as a flow field target so nearby positions share one field.
+        """
+        cx = min(self.cols - 1, (i % self.cols) // block * block + block // 2)
+        cy = min(self.rows - 1, (i // self.cols) // block * block + block // 2)
+        c = cy * self.cols + cx
+        return c if self.walkable[c] else i
+
+    def build_field(self, sources) -> list:
+        """
+        BFS distance (in cells) from the nearest source to every cell.
+        """
+        dist = [UNREACHABLE] * len(self.walkable)
+        queue = collections.deque()
+        for s in sources:
+            if dist[s] != 0:
+                dist[s] = 0
+                queue.append(s)
+        neighbors = self.neighbors
+        popleft, append = queue.popleft, queue.append
+        while queue:
+            i = popleft()
+            d = dist[i] + 1
+            for n in neighbors[i]:
+                if dist[n] > d:
+                    dist[n] = d
+                    append(n)
+        return dist
+
+    def step(self, field, i):
+        """
+        (dx, dy) towards the lowest-distance neighbour of cell i; diagonal
+        only when both straight cells are open. (0, 0) at the target.
+        """
+        cols = self.cols
+        cx, cy = i % cols, i // cols
+        best = field[i]
+        move = (0, 0)
+        walkable = self.walkable
+        for dx in (-1, 0, 1):
+            nx = cx + dx
+            if not 0 <= nx < cols:
+                continue
+            for dy in (-1, 0, 1):
+                ny = cy + dy
+                if (dx == 0 and dy == 0) or not 0 <= ny < self.rows:
+                    continue
+                n = ny * cols + nx
+                if field[n] >= best:
+                    continue
+                if dx and dy and not (walkable[cy * cols + nx] and walkable[ny * cols + cx]):
+                    continue
+                best = field[n]
+                move = (dx, dy)
+        return move
+
+
+class FlowFieldCache:
+    """
+    LRU of flow fields keyed by target (a cell, or the set of powerup cells).
+    Shared by the arenas of a worker, so lookups and inserts take a lock;
+    builds run outside it.
+    """
+
+    def __init__(self, grid: FlowGrid, max_fields: int = 96):
+        self.grid = grid
+        self.max_fields = max_fields
+        self._fields = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.build_seconds = 0.0  # running estimate (learned from real builds) of whether one fits the budget
+        self.builds = 0
+
+    def get(self, key, sources, deadline=None):
+        """
+        Cached field for `key`, building it from `sources` if it is missing
+        and the estimated build time fits before `deadline` (perf_counter).
+        Returns None when it would not fit.
+        """
+        with self._lock:
+            field = self._fields.get(key)
+            if field is not None:
+                self._fields.move_to_end(key)
+                return field
+        if deadline is not None and time.perf_counter() + self.build_seconds > deadline:
+            return None
+        t0 = time.perf_counter()
+        field = self.grid.build_field(sources)
+        took = time.perf_counter() - t0
+        with self._lock:
+            self.build_seconds = took if not self.build_seconds else 0.8 * self.build_seconds + 0.2 * took
+            self.builds += 1
+            self._fields[key] = field
+            if len(self._fields) > self.max_fields:
+                self._fields.popitem(last=False)
+        return field
+
+
+_SHARED_CACHE = None
+
+
+def shared_cache() -> FlowFieldCache:
+    global _SHARED_CACHE
+    if _SHARED_CACHE is None:
+        _SHARED_CACHE = FlowFieldCache(FlowGrid.shared())
+    return _SHARED_CACHE
+
+
+def _line_of_sight(x1, y1, x2, y2, step=16.0):
+    dist = math.hypot(x2 - x1, y2 - y1)
+    n = int(dist / step)
+    for k in range(1, n):
+        t = k / n
+        px, py = x1 + (x2 - x1) * t, y1 + (y2 - y1) * t
+        if _overlaps_obstacle(px - 2, py - 2, 4, 4):
+            return False
+    return True
+
+
+class Bot:
+    __slots__ = ("pid", "keys", "field", "next_fire", "rng")
+
+    def __init__(self, pid, rng):
+        self.pid = pid
+        self.keys = {"up": False, "down": False, "left": False, "right": False,
+                     "shoot": False, "trap": False, "mouse_pos": None}
+        self.field = None  # last field followed; reused when the budget allows no rebuild
+        self.next_fire = 0.0
+        self.rng = rng
+
+
+class BotController:
+    """
+    Owns the bots of one arena. think() is called by Arena.update_game with
+    the arena lock held, before inputs are applied.
+    """
+
+    def __init__(self, arena, budget_ms: float = 2.0, cache: FlowFieldCache = None, rng=None):
+        """
+        :param arena: the Arena whose players/inputs the bots use
+        :param budget_ms: wall time per tick for all bots together
+        :param cache: flow field cache (defaults to the process-wide one)
+        :param rng: random.Random for aim jitter and trap decisions
+        """
+        self.arena = arena
+        self.budget = budget_ms / 1000.0
+        self.cache = cache or shared_cache()
+        self.grid = self.cache.grid
+        self.rng = rng or random.Random()
+        self.bots = {}  # pid -> Bot
+        self._cursor = 0
+        self.skipped = 0
+        self._m_skipped = BOT_SKIPPED.labels(arena=arena.arena_id)
+        self._m_fields = BOT_FIELDS.labels(arena=arena.arena_id)
+
+    def add_bot(self) -> int:
+        pid = self.arena.add_player()
+        with self.arena.lock:
+            self.bots[pid] = Bot(pid, random.Random(self.rng.getrandbits(32)))
+        return pid
+
+    def remove_bot(self, pid=None):
+        """
+        Take a bot (the newest by default) out of the match; returns its
+        player id, or None if there was none.
+        """
+        if pid is None:
+            if not self.bots:
+                return None
+            pid = max(self.bots)  # newest first
+        with self.arena.lock:
+            self.bots.pop(pid, None)
+        self.arena.remove_player(pid)
+        return pid
+
+    def think(self, now: float):
+        if not self.bots:
+            return
+        deadline = time.perf_counter() + self.budget
+        builds = self.cache.builds
+        order = list(self.bots.values())
+        n = len(order)
+        done = 0
+        # round-robin start so the same bots are not always the ones deferred
+        while done < n and time.perf_counter() < deadline:
+            self._think(order[(self._cursor + done) % n], now, deadline)
+            done += 1
+        self._cursor = (self._cursor + done) % n
+        if self.cache.builds != builds:
+            self._m_fields.inc(self.cache.builds - builds)
+        if done < n:
+            self.skipped += n - done
+            self._m_skipped.inc(n - done)
+
+    def _think(self, bot: Bot, now: float, deadline: float):
+        arena = self.arena
+        me = arena.players.get(bot.pid)
+        if me is None:
+            return
+        keys = bot.keys
+        arena.inputs[bot.pid] = keys
+        keys["shoot"] = False
+        keys["trap"] = False
+        half = TANK_SIZE / 2
+        mx, my = me.x + half, me.y + half
+
+        enemy = None
+        best = float("inf")
+        for pid, p in arena.players.items():
+            if pid == bot.pid:
+                continue
+            d = (p.x - me.x) ** 2 + (p.y - me.y) ** 2
+            if d < best:
+                best, enemy = d, p
+
+        grid = self.grid
+        here = grid.cell_of(me.x, me.y)
+        field = None
+        if enemy is not None:
+            target = grid.snap(grid.cell_of(enemy.x, enemy.y))
+            field = self.cache.get(("cell", target), (target,), deadline)
+        if me.weapon == "basic" and arena.powerups:
+            cells = tuple(sorted({grid.cell_of(p.x, p.y) for p in arena.powerups}))
+            pfield = self.cache.get(("powerups", cells), cells, deadline)
+            if pfield is not None and (field is None or pfield[here] <= field[here] + POWERUP_DETOUR):
+                field = pfield
+                enemy_focus = False
+            else:
+                enemy_focus = True
+        else:
+            enemy_focus = True
+        if field is None:
+            field = bot.field  # stale is better than standing still
+        bot.field = field
+
+        dist = math.sqrt(best) if enemy is not None else float("inf")
+        dx = dy = 0
+        if field is not None and not (enemy_focus and dist < HOLD_RANGE):
+            dx, dy = grid.step(field, here)
+        elif field is None and enemy is not None and dist >= HOLD_RANGE:
+            # no field has fit the budget yet (large maps): head straight for the enemy
+            dx = (enemy.x > me.x + CELL) - (enemy.x < me.x - CELL)
+            dy = (enemy.y > me.y + CELL) - (enemy.y < me.y - CELL)
+        keys["left"], keys["right"] = dx < 0, dx > 0
+        keys["up"], keys["down"] = dy < 0, dy > 0
+
+        if enemy is None:
+            keys["mouse_pos"] = None
+            return
+        ex, ey = enemy.x + half, enemy.y + half
+        jitter = AIM_JITTER
+        keys["mouse_pos"] = (int(ex + bot.rng.uniform(-jitter, jitter)),
+                             int(ey + bot.rng.uniform(-jitter, jitter)))
+        if dist < ENGAGE_RANGE and now >= bot.next_fire and _line_of_sight(mx, my, ex, ey):
+            keys["shoot"] = True
+            bot.next_fire = now + FIRE_INTERVAL
+        if dist < TRAP_RANGE and bot.rng.random() < TRAP_CHANCE:
+            keys["trap"] = True
@@ -1,31 +1,50 @@
 # client.py
-import socket
+import time
+
+_PROCESS_START = time.perf_counter()
+
 import threading
 import json
 import pygame
 import sys
 import os
+from typing import NamedTuple
 
 from game_config import (
     SCREEN_WIDTH, SCREEN_HEIGHT,
+    WORLD_WIDTH, WORLD_HEIGHT,
     TANK_SIZE,
     BULLET_SIZE,
     POWERUP_SIZE, TRAP_SIZE, TRAP_MAX_ACTIVE,
     COLOR_BG,
     COLOR_TANK_1, COLOR_TANK_2, COLOR_TANK_OTHER,
     COLOR_BULLET, COLOR_TEXT, COLOR_POWERUP, COLOR_TRAP, COLOR_WALL,
-    SERVER_PORT,
-    OBSTACLES,
+    TILE_OBSTACLES,
+    SERVER_TICK_RATE,
 )
 
 from weapons import (
     get_primary_weapon_for_player,
     get_secondary_weapon_for_player,
 )
+from asset_cache import load_font, load_scaled_image
+import transport
+from spatial import view_origin
+from net_stats import NetStats
+
+_IMPORTS_DONE = time.perf_counter()
 
 # Allow overriding the server IP via CLI arg or env var for easy LAN setup.
 DEFAULT_SERVER_IP = "192.168.0.136"
 
+# server address: <ip>[:port], unix:/path or any other transport.py address
+# --spectate: watch without a tank (via the server or a relay.py at <ip>:<port>)
+SPECTATE = "--spectate" in sys.argv
+# --netlog=FILE: append RTT/jitter/bandwidth once per second as CSV
+NETLOG = next((a.split("=", 1)[1] for a in sys.argv[1:] if a.startswith("--netlog=")), None)
+
+CAMERA_PAN_SPEED = 900  # px/s a spectator's camera moves with the movement keys
+
 BULLET_PALETTE = [
     (255, 255, 255),
     (255, 180, 80),
@@ -36,13 +55,31 @@ BULLET_PALETTE = [
     (120, 255, 220),
 ]
 
+
+class WorldSnapshot(NamedTuple):
+    """
+    Immutable copy of one server state message.
+
+    The network thread builds a new snapshot per message and publishes it by
+    rebinding the module-level ``snapshot`` name; the render loop only ever
+    reads that reference, so no lock is needed on either side.
+    """
+    version: int
+    players: dict
+    bullets: tuple
+    powerups: tuple
+    traps: tuple
+    tick: int = None         # server tick the state is from
+    received: float = None   # perf_counter when it arrived
+
+
+EMPTY_SNAPSHOT = WorldSnapshot(0, {}, (), (), ())
+
 player_id = None
 player_uid = None
-players = {}
-bullets = []
-powerups = []
-traps = []
-state_lock = threading.Lock()
+snapshot = EMPTY_SNAPSHOT
+net = NetStats(SERVER_TICK_RATE)  # replaced in main() once the CSV option is known
+show_net_graph = False
 
 keys_state = {
     "up": False,
@@ -66,21 +103,75 @@ def bullet_color_for_owner(owner):
     except Exception:
         return COLOR_BULLET
 
-def network_thread(sock):
-    global player_id, player_uid, players, bullets, powerups, traps, running
-
-    buffer = ""
+def handle_message(msg, arrival=None):
+    global player_id, player_uid, snapshot
+
+    if arrival is None:
+        arrival = time.perf_counter()
+    if msg.get("type") == "init":
+        net.on_connect()
+        player_id = msg["player_id"]
+        player_uid = msg.get("player_uid")
+        if msg.get("spectator"):
+            print(f"[CLIENT] Spectating arena {msg.get('arena')}")
+        else:
+            print(f"[CLIENT] My player_id = {player_id} | uid = {player_uid}")
+        if msg.get("compression"):
+            print(f"[CLIENT] Frames compressed with {msg['compression']}")
+    elif msg.get("type") == "error":
+        print(f"[CLIENT] Server: {msg.get('reason')}")
+    elif msg.get("type") == "pong":
+        net.on_pong(msg, arrival)
+    elif msg.get("type") == "state":
+        net.on_snapshot(msg.get("tick"), msg.get("time"), arrival)
+        # single reference swap; the render loop never sees a half-built state
+        snapshot = WorldSnapshot(
+            snapshot.version + 1,
+            msg.get("players", {}),
+            tuple(msg.get("bullets", ())),
+            tuple(msg.get("powerups", ())),
+            tuple(msg.get("traps", ())),
+            msg.get("tick"),
+            arrival,
+        )
+
+def handle_frames(frames, arrival):
+    # inflated frames from FrameDecompressor; one that does not parse is
+    # skipped like a garbled plain line
+    for frame in frames:
+        try:
+            msg = json.loads(frame)
+        except ValueError:  # JSONDecodeError, or bytes that are not UTF-8
+            continue
+        handle_message(msg, arrival)
+
+def network_thread(sock, hello):
+    global running
+    # imported on this thread so the window does not wait for it; frames
+    # are only decoded once the server has answered the hello
+    import compression
+
+    buffer = b""
+    decompressor = None  # set once the init accepts compression; frames are binary after that
     try:
+        hello["compression"] = [compression.ENCODING]
+        sock.sendall((json.dumps(hello) + "\n").encode())
         while running:
-            data = sock.recv(4096)
+            data = sock.recv(65536)
             if not data:
                 print("[CLIENT] Disconnected from server.")
                 running = False
                 break
+            arrival = time.perf_counter()
+            net.on_bytes_in(len(data))
+
+            if decompressor is not None:
+                handle_frames(decompressor.feed(data), arrival)
+                continue
 
-            buffer += data.decode()
-            while "\n" in buffer:
-                line, buffer = buffer.split("\n", 1)
+            buffer += data
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
                 if not line.strip():
                     continue
                 try:
@@ -88,29 +179,37 @@ def network_thread(sock):
                 except json.JSONDecodeError:
                     continue
 
-                if msg.get("type") == "init":
-                    player_id = msg["player_id"]
-                    player_uid = msg.get("player_uid")
-                    print(f"[CLIENT] My player_id = {player_id} | uid = {player_uid}")
-                elif msg.get("type") == "state":
-                    with state_lock:
-                        players = msg.get("players", {})
-                        bullets = msg.get("bullets", [])
-                        powerups[:] = msg.get("powerups", [])
-                        traps[:] = msg.get("traps", [])
+                handle_message(msg, arrival)
+                if msg.get("type") == "init" and msg.get("compression") == compression.ENCODING:
+                    decompressor = compression.FrameDecompressor(compression.decode_dictionary(msg["zdict"]))
+                    handle_frames(decompressor.feed(buffer), arrival)
+                    buffer = b""
+                    break
     except ConnectionResetError:
         print("[CLIENT] Connection reset by server.")
+    except OSError as e:
+        print(f"[CLIENT] Connection error: {e}")
     finally:
         running = False
         sock.close()
 
-def send_input(sock):
+def send_input(sock, camera=(0, 0)):
+    # the cursor is tracked in window coordinates; the server aims in world coordinates
+    keys = dict(keys_state)
+    mx, my = keys["mouse_pos"]
+    keys["mouse_pos"] = (mx + camera[0], my + camera[1])
     msg = {
         "type": "input",
-        "keys": keys_state
+        "keys": keys
     }
+    lines = [(json.dumps(msg) + "\n").encode()]
+    now = time.perf_counter()
+    if net.ping_due(now):
+        # rides along with the input: same system call, same packet
+        lines.append((json.dumps(net.ping_message(now)) + "\n").encode())
     try:
-        sock.sendall((json.dumps(msg) + "\n").encode())
+        transport.send_frames(sock, lines)
+        net.on_bytes_out(sum(map(len, lines)))
     except:
         pass
 
@@ -137,8 +236,9 @@ def draw_hud(screen, font, small_font, panel_img, fps, server_ip, current_player
     texts = [
         ("LAN TANKS", font, True),
         (f"Server {server_ip}", small_font, False),
-        (f"Player {current_player_id if current_player_id else 'connecting...'} ({uid_display or 'uid...'}) | Online {len(current_players)}", small_font, False),
-        (f"FPS {int(fps)}", small_font, False),
+        (f"Spectator | Online {len(current_players)}" if SPECTATE else
+         f"Player {current_player_id if current_player_id else 'connecting...'} ({uid_display or 'uid...'}) | Online {len(current_players)}", small_font, False),
+        (f"FPS {int(fps)} | F3 net graph", small_font, False),
         (f"Weapon {weapon_name}", small_font, False),
         (f"Traps {traps_active}/{TRAP_MAX_ACTIVE}", small_font, False),
     ]
@@ -180,10 +280,48 @@ def draw_hud(screen, font, small_font, panel_img, fps, server_ip, current_player
     footer.blit(small_font.render(guide_text, True, COLOR_TEXT), (16, 10))
     screen.blit(footer, (0, SCREEN_HEIGHT - 48))
 
+def draw_net_graph(screen, small_font, stats):
+    """
+    F3 overlay (top right): connection numbers, and one bar per received
+    frame showing the gap since the previous one. The line marks one
+    server tick; late frames are red.
+    """
+    w, h = 320, 170
+    panel = pygame.Surface((w, h), pygame.SRCALPHA)
+    panel.fill((10, 10, 14, 190))
+
+    def ms(v):
+        return "--" if v is None else f"{v:.0f} ms"
+
+    lines = [
+        f"RTT {ms(stats.rtt_ms)} | jitter {stats.jitter_ms:.1f} ms",
+        f"Snapshot age {ms(stats.age_ms)} | {stats.frame_rate:.0f} frames/s",
+        f"Server tick {ms(stats.server_tick_ms)} | FPS {stats.fps:.0f}",
+        f"In {stats.in_rate / 1024:.1f} KB/s | Out {stats.out_rate / 1024:.1f} KB/s",
+        f"Dropped {stats.dropped} | Late {stats.late}",
+    ]
+    y = 6
+    for text in lines:
+        panel.blit(small_font.render(text, True, COLOR_TEXT), (10, y))
+        y += 18
+
+    top, bottom = y + 4, h - 6
+    scale = (bottom - top) / (stats.tick_ms * 4)  # the graph tops out at four ticks
+    x = w - 10 - 2 * len(stats.intervals)
+    for gap_ms, late in stats.intervals:
+        bar = min(bottom - top, max(1, int(gap_ms * scale)))
+        pygame.draw.line(panel, (255, 80, 80) if late else (0, 200, 255), (x, bottom), (x, bottom - bar))
+        x += 2
+    tick_y = bottom - int(stats.tick_ms * scale)
+    pygame.draw.line(panel, (120, 120, 120), (10, tick_y), (w - 10, tick_y))
+
+    screen.blit(panel, (SCREEN_WIDTH - w - 16, 16))
+
 def resolve_server_ip():
     # Priority: CLI arg -> env var -> default
-    if len(sys.argv) > 1:
-        return sys.argv[1]
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if args:
+        return args[0]
     env_ip = os.environ.get("LAN_TANK_SERVER")
     if env_ip:
         return env_ip
@@ -193,8 +331,7 @@ def resolve_server_ip():
 def load_assets():
     # Load map background and HUD panel; fall back to solid fills if missing.
     try:
-        map_bg = pygame.image.load(os.path.join("assets", "map_bg.png")).convert()
-        map_bg = pygame.transform.scale(map_bg, (SCREEN_WIDTH, SCREEN_HEIGHT))
+        map_bg = load_scaled_image(os.path.join("assets", "map_bg.png"), (SCREEN_WIDTH, SCREEN_HEIGHT))
     except Exception:
         map_bg = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
         map_bg.fill((25, 30, 40))
@@ -208,26 +345,171 @@ def load_assets():
 
     return map_bg, hud_panel
 
+
+def draw_obstacles(surface):
+    # Obstacles never move, so they are baked into the background tile once.
+    for ob in TILE_OBSTACLES:
+        pygame.draw.rect(
+            surface,
+            COLOR_WALL,
+            pygame.Rect(int(ob["x"]), int(ob["y"]), int(ob["w"]), int(ob["h"])),
+            border_radius=6,
+        )
+
+
+def draw_background(screen, map_bg, camera):
+    # the map repeats one screen-sized tile, so at most four blits cover the view
+    cx, cy = camera
+    for ty in range(cy // SCREEN_HEIGHT, (cy + SCREEN_HEIGHT - 1) // SCREEN_HEIGHT + 1):
+        for tx in range(cx // SCREEN_WIDTH, (cx + SCREEN_WIDTH - 1) // SCREEN_WIDTH + 1):
+            screen.blit(map_bg, (tx * SCREEN_WIDTH - cx, ty * SCREEN_HEIGHT - cy))
+
+
+def update_camera(camera, current, current_player_id, dt):
+    """
+    Top-left of the view in world coordinates: centred on the local tank
+    (the same rule the server uses to pick what to send), or panned with
+    the movement keys while spectating.
+    """
+    p = current.players.get(str(current_player_id)) if current_player_id is not None else None
+    if p is not None:
+        return view_origin(p["x"] + TANK_SIZE / 2, p["y"] + TANK_SIZE / 2,
+                           SCREEN_WIDTH, SCREEN_HEIGHT, WORLD_WIDTH, WORLD_HEIGHT)
+    if not SPECTATE:
+        return camera
+    step = CAMERA_PAN_SPEED * dt
+    x = camera[0] + (keys_state["right"] - keys_state["left"]) * step
+    y = camera[1] + (keys_state["down"] - keys_state["up"]) * step
+    return (int(min(max(0, x), WORLD_WIDTH - SCREEN_WIDTH)),
+            int(min(max(0, y), WORLD_HEIGHT - SCREEN_HEIGHT)))
+
+
+def build_world_layout(current, current_player_id, font, small_font):
+    """
+    Turn a snapshot into a flat list of draw commands.
+
+    Only called when a new snapshot arrives, so text rendering and weapon
+    lookups happen once per server tick instead of once per frame.
+    Positions are in world coordinates; draw_world applies the camera.
+    """
+    layout = []
+
+    # powerups
+    for p in current.powerups:
+        cx = int(p["x"] + POWERUP_SIZE // 2)
+        cy = int(p["y"] + POWERUP_SIZE // 2)
+        label = small_font.render(p.get("type", "?")[:1].upper(), True, COLOR_BG)
+        layout.append(("powerup", (cx, cy), label, label.get_rect(center=(cx, cy))))
+
+    # traps
+    for t in current.traps:
+        layout.append(("rect", COLOR_TRAP, pygame.Rect(int(t["x"]), int(t["y"]), TRAP_SIZE, TRAP_SIZE), 4))
+
+    for b in current.bullets:
+        bx = int(b["x"])
+        by = int(b["y"])
+        color = bullet_color_for_owner(b.get("owner"))
+        layout.append(("rect", color, pygame.Rect(bx - BULLET_SIZE // 2, by - BULLET_SIZE // 2, BULLET_SIZE, BULLET_SIZE), 0))
+
+    for pid_str, p in current.players.items():
+        pid = int(pid_str)
+        x = int(p["x"])
+        y = int(p["y"])
+
+        # base tank color
+        if current_player_id is not None and pid == current_player_id:
+            color = COLOR_TANK_1
+        elif pid == 1:
+            color = COLOR_TANK_2
+        else:
+            color = COLOR_TANK_OTHER
+
+        tank_rect = pygame.Rect(x, y, TANK_SIZE, TANK_SIZE)
+        direction = p.get("dir", "up")
+
+        # primary & secondary weapons (cosmetics)
+        weapons = []
+        primary_weapon = get_primary_weapon_for_player(pid, p.get("weapon"))
+        if primary_weapon:
+            weapons.append(primary_weapon)
+        secondary_weapons = get_secondary_weapon_for_player(pid)
+        if secondary_weapons:
+            # secondary_weapons can be a list
+            if isinstance(secondary_weapons, list):
+                weapons.extend(secondary_weapons)
+            else:
+                weapons.append(secondary_weapons)
+
+        # Player identifiers + HP text
+        labels = []
+        uid_text = p.get("uid")
+        if uid_text:
+            labels.append((small_font.render(uid_text[:8], True, COLOR_TEXT), (x, y - 36)))
+        labels.append((font.render(f"HP:{p['hp']}", True, COLOR_TEXT), (x, y - 18)))
+
+        layout.append(("tank", color, tank_rect, direction, weapons, labels))
+
+    return layout
+
+
+def draw_world(screen, layout, camera=(0, 0)):
+    ox, oy = -camera[0], -camera[1]
+    for cmd in layout:
+        kind = cmd[0]
+        if kind == "rect":
+            _, color, rect, radius = cmd
+            pygame.draw.rect(screen, color, rect.move(ox, oy), border_radius=radius)
+        elif kind == "powerup":
+            _, center, label, label_rect = cmd
+            pygame.draw.circle(screen, COLOR_POWERUP, (center[0] + ox, center[1] + oy), POWERUP_SIZE // 2)
+            screen.blit(label, label_rect.move(ox, oy))
+        elif kind == "tank":
+            _, color, tank_rect, direction, weapons, labels = cmd
+            tank_rect = tank_rect.move(ox, oy)
+            pygame.draw.rect(screen, color, tank_rect, border_radius=6)
+            for w in weapons:
+                w.draw(screen, tank_rect, direction)
+            for surf, (x, y) in labels:
+                screen.blit(surf, (x + ox, y + oy))
+
+
 def main():
-    global running, keys_state
+    global running, keys_state, net, show_net_graph
+
+    net = NetStats(SERVER_TICK_RATE, csv_path=NETLOG)
 
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_ip = resolve_server_ip()
     try:
-        sock.connect((server_ip, SERVER_PORT))
+        sock = transport.connect(server_ip)
     except Exception as e:
         print(f"[CLIENT] Failed to connect: {e}")
         return
 
-    threading.Thread(target=network_thread, args=(sock,), daemon=True).start()
+    hello = {"type": "hello", "role": "spectator" if SPECTATE else "player",
+             "view": [SCREEN_WIDTH, SCREEN_HEIGHT]}
+    threading.Thread(target=network_thread, args=(sock, hello), daemon=True).start()
 
-    pygame.init()
+    # Only the modules the game uses; pygame.init() would also probe audio
+    # and joystick devices, which is slow and unused here.
+    pygame.display.init()
+    pygame.font.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("LAN Tanks")
     clock = pygame.time.Clock()
-    font = pygame.font.SysFont("segoeui", 22, bold=True)
-    small_font = pygame.font.SysFont("segoeui", 16)
+
+    t_fonts = time.perf_counter()
+    font = load_font("segoeui", 22, bold=True)
+    small_font = load_font("segoeui", 16)
+    t_assets = time.perf_counter()
     map_bg, hud_panel = load_assets()
+    draw_obstacles(map_bg)
+    t_assets_done = time.perf_counter()
+    first_frame = True
+
+    world_layout = []
+    layout_version = -1
+    layout_player_id = None
+    camera = (0, 0)
 
     while running:
         dt = clock.tick(60) / 1000.0
@@ -240,6 +522,8 @@ def main():
                 running = False
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                show_net_graph = not show_net_graph
 
             elif event.type == pygame.KEYDOWN:
                 if event.key in (pygame.K_w, pygame.K_UP):
@@ -274,101 +558,38 @@ def main():
             elif event.type == pygame.MOUSEMOTION:
                 keys_state["mouse_pos"] = event.pos
 
-        send_input(sock)
+        if not SPECTATE:
+            send_input(sock, camera)
 
-        with state_lock:
-            current_players = dict(players)
-            current_bullets = list(bullets)
-            current_powerups = list(powerups)
-            current_traps = list(traps)
+        current = snapshot
+        if current.version != layout_version or player_id != layout_player_id:
+            world_layout = build_world_layout(current, player_id, font, small_font)
+            layout_version = current.version
+            layout_player_id = player_id
 
-        screen.blit(map_bg, (0, 0))
+        camera = update_camera(camera, current, player_id, dt)
+        draw_background(screen, map_bg, camera)
+        draw_world(screen, world_layout, camera)
 
-        # draw obstacles
-        for ob in OBSTACLES:
-            pygame.draw.rect(
-                screen,
-                COLOR_WALL,
-                pygame.Rect(int(ob["x"]), int(ob["y"]), int(ob["w"]), int(ob["h"])),
-                border_radius=6,
-            )
+        draw_hud(screen, font, small_font, hud_panel, clock.get_fps(), server_ip, player_id, player_uid, current.players)
+        net.on_render(current.received, time.perf_counter(), clock.get_fps())
+        if show_net_graph:
+            draw_net_graph(screen, small_font, net)
 
-        # draw powerups
-        for p in current_powerups:
-            cx = int(p["x"] + POWERUP_SIZE // 2)
-            cy = int(p["y"] + POWERUP_SIZE // 2)
-            pygame.draw.circle(screen, COLOR_POWERUP, (cx, cy), POWERUP_SIZE // 2)
-            label = small_font.render(p.get("type", "?")[:1].upper(), True, COLOR_BG)
-            rect = label.get_rect(center=(cx, cy))
-            screen.blit(label, rect)
-
-        # draw traps
-        for t in current_traps:
-            pygame.draw.rect(
-                screen,
-                COLOR_TRAP,
-                pygame.Rect(int(t["x"]), int(t["y"]), TRAP_SIZE, TRAP_SIZE),
-                border_radius=4,
-            )
+        pygame.display.flip()
 
-        for b in current_bullets:
-            bx = int(b["x"])
-            by = int(b["y"])
-            color = bullet_color_for_owner(b.get("owner"))
-            pygame.draw.rect(
-                screen,
-                color,
-                pygame.Rect(bx - BULLET_SIZE // 2, by - BULLET_SIZE // 2, BULLET_SIZE, BULLET_SIZE)
+        if first_frame:
+            first_frame = False
+            now = time.perf_counter()
+            print(
+                f"[CLIENT] First frame in {(now - _PROCESS_START) * 1000:.0f} ms "
+                f"(imports {(_IMPORTS_DONE - _PROCESS_START) * 1000:.0f} ms, "
+                f"fonts {(t_assets - t_fonts) * 1000:.0f} ms, "
+                f"assets {(t_assets_done - t_assets) * 1000:.0f} ms)"
             )
 
-        for pid_str, p in current_players.items():
-            pid = int(pid_str)
-            x = int(p["x"])
-            y = int(p["y"])
-
-            # base tank color
-            if player_id is not None and pid == player_id:
-                color = COLOR_TANK_1
-            elif pid == 1:
-                color = COLOR_TANK_2
-            else:
-                color = COLOR_TANK_OTHER
-
-            # tank rect
-            tank_rect = pygame.Rect(x, y, TANK_SIZE, TANK_SIZE)
-
-            # draw tank body
-            pygame.draw.rect(screen, color, tank_rect, border_radius=6)
-
-            # draw primary & secondary weapons (cosmetics)
-            direction = p.get("dir", "up")
-
-            primary_weapon = get_primary_weapon_for_player(pid, p.get("weapon"))
-            if primary_weapon:
-                primary_weapon.draw(screen, tank_rect, direction)
-
-            secondary_weapons = get_secondary_weapon_for_player(pid)
-            if secondary_weapons:
-                # secondary_weapons can be a list
-                if isinstance(secondary_weapons, list):
-                    for w in secondary_weapons:
-                        w.draw(screen, tank_rect, direction)
-                else:
-                    secondary_weapons.draw(screen, tank_rect, direction)
-
-            # Player identifiers + HP text
-            uid_text = p.get("uid")
-            if uid_text:
-                uid_label = small_font.render(uid_text[:8], True, COLOR_TEXT)
-                screen.blit(uid_label, (x, y - 36))
-            hp_text = font.render(f"HP:{p['hp']}", True, COLOR_TEXT)
-            screen.blit(hp_text, (x, y - 18))
-
-        draw_hud(screen, font, small_font, hud_panel, clock.get_fps(), server_ip, player_id, player_uid, current_players)
-
-        pygame.display.flip()
-
     pygame.quit()
+    net.close()
     try:
         sock.close()
     except:
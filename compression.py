@@ -0,0 +1,214 @@
+# compression.py
+"""
+Optional compression of state frames.
+
+- Raw deflate with a preset dictionary ("zlib-dict"): each frame is
+  compressed on its own, so one compressed copy per tick serves every
+  client that negotiated it
+- The dictionary is trained from simulated frames: the JSON fragments
+  that repeat between numbers (keys, weapon names, separators)
+- After an init that accepted compression, frames are sent as
+  <u32 length><deflate bytes> instead of newline-terminated JSON
+
+Train a new dictionary:
+    python compression.py --out assets/state.zdict
+"""
+
+import argparse
+import base64
+import collections
+import os
+import re
+import struct
+import zlib
+
+ENCODING = "zlib-dict"
+_LENGTH = struct.Struct("<I")
+_WBITS = -15  # raw deflate: no zlib header or checksum per frame
+
+# fallback when no trained dictionary file is present: train_dictionary(size=512)
+# over _sample_frames(300, 99), one line per fragment, in output order
+DEFAULT_DICTIONARY = (
+    b'}]}\n'
+    b',"type":"heavy"}],"traps":[{"x":'
+    b',"type":"rapid"}],"traps":[]}\n'
+    b',"type":"spread"}],"traps":[]}\n'
+    b',"time":'
+    b'}],"powerups":[],"traps":[]}\n'
+    b'}],"powerups":[{"x":'
+    b',"players":{"'
+    b'}},"bullets":[{"x":'
+    b'{"type":"state","tick":'
+    b',"weapon":"spread","weapon_timer":'
+    b',"weapon":"bouncy","weapon_timer":'
+    b',"dir":"down","hp":'
+    b'},"'
+    b',"dir":"up","hp":'
+    b',"x":'
+    b',"dir":"right","hp":'
+    b',"dir":"left","hp":'
+    b'":{"uid":'
+    b',"active_traps":'
+    b',"trap_cooldown":'
+    b',"weapon":"basic","weapon_timer":'
+    b',"y":'
+    b',"dy":'
+    b',"dx":'
+    b',"dmg":'
+    b'},{"x":'
+    b',"owner":'
+    b',"bounces":'
+)
+
+_NUMBER = re.compile(rb'-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|"[0-9a-f]{32}"')
+
+
+def load_dictionary(path: str) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if data:
+            return data
+    except OSError:
+        pass
+    return DEFAULT_DICTIONARY
+
+
+def dictionary_id(zdict: bytes) -> int:
+    return zlib.crc32(zdict)
+
+
+def encode_dictionary(zdict: bytes) -> str:
+    return base64.b64encode(zdict).decode("ascii")
+
+
+def decode_dictionary(text: str) -> bytes:
+    return base64.b64decode(text)
+
+
+class FrameCompressor:
+    """
+    Compresses whole frames against a preset dictionary. A fresh
+    compressor per frame keeps frames independent; at the default memLevel
+    setting one up costs about as much as copying a primed one.
+    """
+
+    def __init__(self, zdict: bytes, level: int = 6):
+        self.zdict = zdict
+        self.level = level
+
+    def compress(self, frame: bytes) -> bytes:
+        """
+        One length-prefixed compressed frame, ready to send.
+        """
+        c = zlib.compressobj(self.level, zlib.DEFLATED, _WBITS, zlib.DEF_MEM_LEVEL,
+                             zlib.Z_DEFAULT_STRATEGY, self.zdict)
+        body = c.compress(frame) + c.flush()
+        return _LENGTH.pack(len(body)) + body
+
+
+class FrameDecompressor:
+    """
+    Splits a byte stream of length-prefixed frames and inflates them.
+    A frame that does not inflate is skipped and counted in bad_frames;
+    frames are independent, so the next one decodes as usual.
+    """
+
+    def __init__(self, zdict: bytes):
+        self.zdict = zdict
+        self.bad_frames = 0
+        self._buffer = b""
+
+    def feed(self, data: bytes, sizes: list = None):
+        """
+        Return the complete frames found after appending `data`. If given,
+        `sizes` gets the on-the-wire size of each returned frame.
+        """
+        buf = self._buffer + data
+        frames = []
+        pos = 0
+        while len(buf) - pos >= _LENGTH.size:
+            (size,) = _LENGTH.unpack_from(buf, pos)
+            end = pos + _LENGTH.size + size
+            if end > len(buf):
+                break
+            d = zlib.decompressobj(_WBITS, zdict=self.zdict)
+            try:
+                frame = d.decompress(buf[pos + _LENGTH.size:end]) + d.flush()
+            except zlib.error:
+                self.bad_frames += 1
+                pos = end
+                continue
+            frames.append(frame)
+            if sizes is not None:
+                sizes.append(end - pos)
+            pos = end
+        self._buffer = buf[pos:]
+        return frames
+
+
+def train_dictionary(frames, size: int = 8192) -> bytes:
+    """
+    Build a preset dictionary from sample frames: the non-numeric fragments
+    between numbers, ranked by how many bytes they would save. zlib matches
+    closer data more cheaply, so the most valuable fragments go last.
+    """
+    scores = collections.Counter()
+    for frame in frames:
+        for fragment in _NUMBER.split(frame):
+            if len(fragment) >= 3:
+                scores[fragment] += len(fragment)
+    chosen = []
+    total = 0
+    for fragment, _ in scores.most_common():
+        if total + len(fragment) > size:
+            continue
+        chosen.append(fragment)
+        total += len(fragment)
+    return b"".join(reversed(chosen))
+
+
+def _sample_frames(ticks: int, seed: int):
+    # simulated matches of different sizes; imported here to keep this module light
+    from bench import SCENARIOS, build_arena
+    from game_config import SERVER_TICK_RATE
+    from event_log import EVENTS, LEVELS
+
+    EVENTS.min_level = LEVELS["error"] + 1
+    dt = 1.0 / SERVER_TICK_RATE
+    frames = []
+    for name in ("players_2", "players_16", "bounce_heavy", "spread_heavy", "trap_dense"):
+        arena, clock, driver = build_arena(SCENARIOS[name], seed)
+        for tick in range(ticks):
+            driver.step(arena, tick)
+            arena.update_game(dt)
+            clock.advance(dt)
+            if tick % 10 == 0:
+                now = clock()
+                frames.append(arena.encode_state(now, arena.state_head(now)))
+    return frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the state-frame compression dictionary")
+    parser.add_argument("--out", default=os.path.join("assets", "state.zdict"))
+    parser.add_argument("--size", type=int, default=8192, help="dictionary size in bytes (max 32768)")
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=99)
+    args = parser.parse_args(argv)
+
+    frames = _sample_frames(args.ticks, args.seed)
+    zdict = train_dictionary(frames, min(args.size, 32768))
+    with open(args.out, "wb") as f:
+        f.write(zdict)
+
+    raw = sum(len(f) for f in frames)
+    plain = sum(len(zlib.compress(f)) for f in frames)
+    comp = FrameCompressor(zdict)
+    packed = sum(len(comp.compress(f)) for f in frames)
+    print(f"[ZDICT] {len(zdict)} bytes from {len(frames)} frames -> {args.out} (id {dictionary_id(zdict):08x})")
+    print(f"[ZDICT] raw {raw} B, zlib {plain} B ({raw / plain:.1f}x), zlib+dict {packed} B ({raw / packed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# entities.py
+"""
+Compact entity records for the LAN Tanks server.
+
+- __slots__ classes instead of per-entity dicts
+- Stable integer ids for the lifetime of each entity
+- Preallocated pools so bullets/traps are recycled, not reallocated
+- Each record writes its own JSON fragment for the state broadcast
+"""
+
+from game_config import TANK_HP
+
+
+class Player:
+    __slots__ = (
+        "id", "uid", "x", "y", "dir", "hp",
+        "weapon", "weapon_expires", "trap_ready_at", "active_traps", "ack",
+    )
+
+    def __init__(self, pid: int, uid: str, x, y):
+        self.id = pid
+        self.uid = uid
+        self.ack = 0  # seq of the last input applied (0 = client does not send seqs)
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        """
+        Respawn in place: same id and uid, fresh stats.
+        """
+        self.x = x
+        self.y = y
+        self.dir = "up"
+        self.hp = TANK_HP
+        self.weapon = "basic"
+        self.weapon_expires = 0.0
+        self.trap_ready_at = 0.0
+        self.active_traps = 0
+
+    def to_json(self, now: float) -> str:
+        weapon_timer = self.weapon_expires - now
+        trap_cooldown = self.trap_ready_at - now
+        return (
+            f'"{self.id}":{{"uid":"{self.uid}","x":{self.x!r},"y":{self.y!r},'
+            f'"dir":"{self.dir}","hp":{self.hp},"weapon":"{self.weapon}",'
+            f'"weapon_timer":{weapon_timer if weapon_timer > 0.0 else 0.0!r},'
+            f'"trap_cooldown":{trap_cooldown if trap_cooldown > 0.0 else 0.0!r},'
+            f'"active_traps":{self.active_traps}'
+            + (f',"ack":{self.ack}}}' if self.ack else "}")
+        )
+
+
+class Bullet:
+    __slots__ = ("id", "x", "y", "dx", "dy", "owner", "dmg", "bounces", "target")
+
+    def __init__(self):
+        self.id = 0
+        self.x = 0.0
+        self.y = 0.0
+        self.dx = 0.0
+        self.dy = 0.0
+        self.owner = 0
+        self.dmg = 1
+        self.bounces = 0
+        self.target = None  # tank entered during the last step (server only, not sent)
+
+    def to_json(self) -> str:
+        return (
+            f'{{"x":{self.x!r},"y":{self.y!r},"dx":{self.dx!r},"dy":{self.dy!r},'
+            f'"owner":{self.owner},"dmg":{self.dmg},"bounces":{self.bounces}}}'
+        )
+
+
+class Trap:
+    __slots__ = ("id", "x", "y", "owner", "_json")
+
+    def __init__(self):
+        self.id = 0
+        self.x = 0
+        self.y = 0
+        self.owner = 0
+        self._json = None
+
+    def place(self, x, y, owner: int):
+        self.x = x
+        self.y = y
+        self.owner = owner
+        self._json = None
+
+    def to_json(self) -> str:
+        # traps never move, so the fragment is built once per placement
+        if self._json is None:
+            self._json = f'{{"x":{self.x!r},"y":{self.y!r},"owner":{self.owner}}}'
+        return self._json
+
+
+class Powerup:
+    __slots__ = ("id", "x", "y", "type", "_json")
+
+    def __init__(self, pid: int, x, y, ptype: str):
+        self.id = pid
+        self.x = x
+        self.y = y
+        self.type = ptype
+        self._json = f'{{"x":{x!r},"y":{y!r},"type":"{ptype}"}}'
+
+    def to_json(self) -> str:
+        return self._json
+
+
+class EntityPool:
+    """
+    Free list of preallocated records. acquire() hands out a record with a
+    fresh id; release() returns it for reuse. Grows if the pool runs dry.
+    """
+
+    def __init__(self, factory, size: int):
+        self._factory = factory
+        self._free = [factory() for _ in range(size)]
+        self._next_id = 1
+
+    def acquire(self):
+        obj = self._free.pop() if self._free else self._factory()
+        obj.id = self._next_id
+        self._next_id += 1
+        return obj
+
+    def release(self, obj):
+        self._free.append(obj)
+
+    @property
+    def free_count(self) -> int:
+        # records waiting for reuse (not the number handed out)
+        return len(self._free)
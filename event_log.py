@@ -0,0 +1,176 @@
+# event_log.py
+"""
+Structured game event log that stays off the simulation hot path.
+
+- emit() appends a record to an in-memory queue and returns; it never
+  blocks and never touches stdout or a file
+- A background writer drains the queue in batches to stdout (readable
+  lines) or to a size-rotated JSONL file
+- Records below the configured level are discarded at emit() time; when
+  the queue is full new records are dropped and counted
+"""
+
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+from game_config import (
+    EVENT_LOG_LEVEL, EVENT_LOG_FILE, EVENT_LOG_MAX_BYTES, EVENT_LOG_BACKUPS,
+    EVENT_LOG_QUEUE_SIZE,
+)
+from metrics import REGISTRY
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+EVENTS_WRITTEN = REGISTRY.counter("tanks_event_log_written_total", "Event records written by the background writer", ("process",))
+EVENTS_DROPPED = REGISTRY.counter("tanks_event_log_dropped_total", "Event records dropped because the queue was full", ("process",))
+
+
+class EventLog:
+    def __init__(self, level: str = "info", path: str = None, max_bytes: int = 10 << 20,
+                 backups: int = 3, queue_size: int = 10000, flush_interval: float = 0.2):
+        """
+        :param level: minimum level that is kept ("debug", "info", ...)
+        :param path: JSONL file to write; None writes readable lines to stdout
+        :param max_bytes: rotate the file once it grows past this size
+        :param backups: rotated files to keep (path.1 ... path.N)
+        :param queue_size: records buffered before new ones are dropped
+        :param flush_interval: seconds the writer sleeps between batches
+        """
+        self.min_level = LEVELS.get(level, 20)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.process = "main"  # metrics label; workers rename it via use_suffix()
+        self.written = 0
+        self.dropped = 0
+        self._queue = collections.deque()
+        self._thread = None
+        self._file = None
+        self._start_lock = threading.Lock()
+
+    def enabled(self, level: str) -> bool:
+        return LEVELS.get(level, 20) >= self.min_level
+
+    def emit(self, level: str, event: str, **fields):
+        """
+        Queue one record. Cheap and non-blocking; safe from any thread.
+        """
+        if LEVELS.get(level, 20) < self.min_level:
+            return
+        if len(self._queue) >= self.queue_size:
+            self.dropped += 1
+            return
+        # deque.append is atomic, so producers never take a lock here
+        self._queue.append((time.time(), level, event, fields))
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        queue = self._queue
+        batch = []
+        while queue:
+            try:
+                batch.append(queue.popleft())
+            except IndexError:
+                break
+        if not batch:
+            return
+        if self.path:
+            self._write_file(batch)
+        else:
+            self._write_stdout(batch)
+        self.written += len(batch)
+
+    def _write_stdout(self, batch):
+        lines = []
+        for ts, level, event, fields in batch:
+            scope = f"ARENA {fields['arena']}" if "arena" in fields else "SERVER"
+            detail = " ".join(f"{k}={v}" for k, v in fields.items() if k != "arena")
+            lines.append(f"[{scope}] {event} {detail}\n")
+        try:
+            sys.stdout.write("".join(lines))
+            sys.stdout.flush()
+        except (OSError, ValueError):
+            pass
+
+    def _write_file(self, batch):
+        data = "".join(
+            json.dumps({"ts": round(ts, 4), "level": level, "event": event, **fields}) + "\n"
+            for ts, level, event, fields in batch
+        )
+        try:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(data)
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError:
+            self.dropped += len(batch)
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def use_suffix(self, suffix: str):
+        """
+        Give this process its own file (events.jsonl -> events.<suffix>.jsonl)
+        so worker processes never rotate each other's files.
+        """
+        self.process = suffix
+        self.written = self.dropped = 0
+        if self.path:
+            root, ext = os.path.splitext(self.path)
+            self.path = f"{root}.{suffix}{ext}"
+            self._file = None
+
+    def _after_fork(self):
+        # the writer thread does not survive fork; the child starts its own
+        self._queue = collections.deque()
+        self._thread = None
+        self._file = None
+        self._start_lock = threading.Lock()
+
+    def _collect_metrics(self):
+        EVENTS_WRITTEN.labels(process=self.process).set(self.written)
+        EVENTS_DROPPED.labels(process=self.process).set(self.dropped)
+
+
+EVENTS = EventLog(
+    level=EVENT_LOG_LEVEL,
+    path=EVENT_LOG_FILE,
+    max_bytes=EVENT_LOG_MAX_BYTES,
+    backups=EVENT_LOG_BACKUPS,
+    queue_size=EVENT_LOG_QUEUE_SIZE,
+)
+REGISTRY.add_collector(EVENTS._collect_metrics)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=EVENTS._after_fork)
@@ -0,0 +1,265 @@
+# fanout.py
+"""
+Snapshot fan-out from an arena to network worker processes.
+
+- The arena encodes each state frame once and publishes it into a ring
+  buffer in multiprocessing.shared_memory
+- Fan-out worker processes read the newest frame and send it to their
+  share of the clients, so per-socket send cost stays off the tick thread
+- Readers use a per-slot sequence number (seqlock) to detect frames that
+  were overwritten while being copied
+- A slot carries the plain frame and, when any client negotiated it, the
+  compressed copy; each client is sent the one it asked for
+- Sends never block: a client that cannot keep up skips to the newest
+  frame (like relay.py viewers) instead of holding up the others
+"""
+
+import itertools
+import multiprocessing
+import socket
+import struct
+import threading
+from multiprocessing import shared_memory
+
+# latest published seq, slot count, slot size
+_RING_HEADER = struct.Struct("<QII")
+# seq of the frame in this slot (0 while being written), frame length
+_SLOT_HEADER = struct.Struct("<QI")
+# length of the plain frame at the start of a published slot; the rest is the compressed copy
+_VARIANTS = struct.Struct("<I")
+
+# fan-out processes are started from a busy arena worker; a fork would hand
+# each one every client socket open at that moment, so they come from a
+# fork server (started by exec, holding no client fds) instead
+_CTX = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+class SnapshotRing:
+    """
+    Single-writer, multi-reader ring of encoded frames in shared memory.
+    """
+
+    def __init__(self, slot_count: int = 4, slot_size: int = 1 << 20, name: str = None):
+        """
+        :param slot_count: frames kept before the oldest is overwritten
+        :param slot_size: maximum frame size in bytes
+        :param name: attach to an existing ring instead of creating one
+        """
+        if name is None:
+            stride = _SLOT_HEADER.size + slot_size
+            self.shm = shared_memory.SharedMemory(create=True, size=_RING_HEADER.size + slot_count * stride)
+            _RING_HEADER.pack_into(self.shm.buf, 0, 0, slot_count, slot_size)
+            self.owner = True
+        else:
+            # workers share the creating process's resource tracker (the
+            # fork server passes it on), so attaching does not change cleanup
+            self.shm = shared_memory.SharedMemory(name=name)
+            _, slot_count, slot_size = _RING_HEADER.unpack_from(self.shm.buf, 0)
+            self.owner = False
+        self.name = self.shm.name
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self._stride = _SLOT_HEADER.size + slot_size
+        self._seq = 0
+
+    def _slot_offset(self, seq: int) -> int:
+        return _RING_HEADER.size + (seq % self.slot_count) * self._stride
+
+    def publish(self, data: bytes):
+        """
+        Write one frame. Returns its sequence number, or None if the frame
+        does not fit in a slot (the caller must deliver it another way).
+        """
+        size = len(data)
+        if size > self.slot_size:
+            return None
+        seq = self._seq + 1
+        buf = self.shm.buf
+        off = self._slot_offset(seq)
+        _SLOT_HEADER.pack_into(buf, off, 0, size)
+        start = off + _SLOT_HEADER.size
+        buf[start:start + size] = data
+        _SLOT_HEADER.pack_into(buf, off, seq, size)
+        _RING_HEADER.pack_into(buf, 0, seq, self.slot_count, self.slot_size)
+        self._seq = seq
+        return seq
+
+    def latest_seq(self) -> int:
+        return _RING_HEADER.unpack_from(self.shm.buf, 0)[0]
+
+    def read_latest(self, after_seq: int = 0):
+        """
+        Return (seq, frame) for the newest frame newer than after_seq, or
+        (after_seq, None) if there is nothing new.
+        """
+        buf = self.shm.buf
+        for _ in range(4):
+            seq = _RING_HEADER.unpack_from(buf, 0)[0]
+            if seq <= after_seq:
+                return after_seq, None
+            off = self._slot_offset(seq)
+            slot_seq, size = _SLOT_HEADER.unpack_from(buf, off)
+            if slot_seq != seq:
+                continue  # writer lapped us; retry with the new latest
+            start = off + _SLOT_HEADER.size
+            data = bytes(buf[start:start + size])
+            if _SLOT_HEADER.unpack_from(buf, off)[0] == seq:
+                return seq, data
+        return after_seq, None
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class _Client:
+    __slots__ = ("sock", "compressed", "out", "next_frame")
+
+    def __init__(self, sock, compressed: bool):
+        self.sock = sock
+        self.compressed = compressed
+        self.out = None         # memoryview of the frame being sent
+        self.next_frame = None  # newest frame waiting behind `out`
+
+
+def _flush(client: _Client) -> bool:
+    """
+    Send as much of the client's pending frames as the socket takes now.
+    False if the connection is dead.
+    """
+    while client.out is not None:
+        try:
+            # MSG_DONTWAIT, not setblocking(False): the arena's reader thread
+            # shares this socket's file description and must keep blocking
+            sent = client.sock.send(client.out, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        if sent < len(client.out):
+            client.out = client.out[sent:]
+            continue
+        client.out, client.next_frame = client.next_frame, None
+    return True
+
+
+def fanout_worker_main(worker_index, ring_name, wakeup, pipe):
+    """
+    Entry point of a fan-out process. Commands arrive on `pipe`:
+    ("add", conn_id, (socket, compressed)), ("remove", conn_id, None) and
+    ("stop", 0, None).
+    """
+    ring = SnapshotRing(name=ring_name)
+    clients = {}  # conn_id -> _Client
+    last_seq = 0
+    try:
+        while True:
+            while pipe.poll():
+                cmd, conn_id, payload = pipe.recv()
+                if cmd == "add":
+                    clients[conn_id] = _Client(*payload)
+                elif cmd == "remove":
+                    old = clients.pop(conn_id, None)
+                    if old is not None:
+                        old.sock.close()
+                elif cmd == "stop":
+                    return
+
+            data = None
+            if wakeup.wait(0.1):
+                wakeup.clear()
+                last_seq, data = ring.read_latest(last_seq)
+            if data is not None:
+                split = _VARIANTS.size + _VARIANTS.unpack_from(data, 0)[0]
+                plain = memoryview(data)[_VARIANTS.size:split]
+                packed = memoryview(data)[split:]
+
+            # a client still busy with an older frame keeps only the newest one;
+            # leftovers of a partly sent frame go out first so frames stay whole
+            for conn_id, client in list(clients.items()):
+                if data is not None:
+                    frame = packed if client.compressed and packed else plain
+                    if client.out is None:
+                        client.out = frame
+                    else:
+                        client.next_frame = frame
+                if not _flush(client):
+                    clients.pop(conn_id, None)
+                    client.sock.close()
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        for client in clients.values():
+            client.sock.close()
+        ring.close()
+
+
+class SnapshotFanout:
+    """
+    Owns a SnapshotRing and a set of fan-out processes for one arena.
+    Clients are spread round-robin across the workers.
+    """
+
+    def __init__(self, worker_count: int, slot_count: int, slot_size: int):
+        self.ring = SnapshotRing(slot_count, slot_size)
+        self._ids = itertools.count(1)
+        self._next_worker = itertools.cycle(range(worker_count))
+        self._owners = {}  # conn -> (worker_index, conn_id)
+        self._lock = threading.Lock()
+        self._workers = []
+        for i in range(worker_count):
+            wakeup = _CTX.Event()
+            parent_end, child_end = _CTX.Pipe()
+            proc = _CTX.Process(
+                target=fanout_worker_main,
+                args=(i, self.ring.name, wakeup, child_end),
+                daemon=True,
+            )
+            proc.start()
+            child_end.close()
+            self._workers.append((proc, wakeup, parent_end))
+
+    def add(self, conn, compressed: bool = False):
+        with self._lock:
+            worker_index = next(self._next_worker)
+            conn_id = next(self._ids)
+            self._owners[conn] = (worker_index, conn_id)
+            self._workers[worker_index][2].send(("add", conn_id, (conn, compressed)))
+
+    def remove(self, conn):
+        with self._lock:
+            owner = self._owners.pop(conn, None)
+            if owner is not None:
+                worker_index, conn_id = owner
+                try:
+                    self._workers[worker_index][2].send(("remove", conn_id, None))
+                except OSError:
+                    pass
+
+    def publish(self, data: bytes, compressed: bytes = None) -> bool:
+        """
+        Hand one encoded frame (plus its compressed copy, if any client uses
+        it) to the workers. False means it was too large for the ring and
+        was not delivered.
+        """
+        if self.ring.publish(_VARIANTS.pack(len(data)) + data + (compressed or b"")) is None:
+            return False
+        for _, wakeup, _ in self._workers:
+            wakeup.set()
+        return True
+
+    def close(self):
+        with self._lock:
+            for proc, _, pipe in self._workers:
+                try:
+                    pipe.send(("stop", 0, None))
+                except OSError:
+                    pass
+            for proc, _, _ in self._workers:
+                proc.join(timeout=1.0)
+                if proc.is_alive():
+                    proc.terminate()
+            self.ring.close()
@@ -2,10 +2,15 @@
 SCREEN_WIDTH = 1820
 SCREEN_HEIGHT = 980
 
+MAP_TILES_X = 1   # map size in screens; the obstacle layout repeats on each (e.g. 3 x 3 for a scrolling map)
+MAP_TILES_Y = 1
+WORLD_WIDTH = SCREEN_WIDTH * MAP_TILES_X
+WORLD_HEIGHT = SCREEN_HEIGHT * MAP_TILES_Y
+
 
 TANK_SIZE = 40
-TANK_SPEED = 3
-BULLET_SPEED = 7
+TANK_SPEED = 3      # px per tick at SPEED_TICK_RATE
+BULLET_SPEED = 7    # px per tick at SPEED_TICK_RATE
 BULLET_SIZE = 8
 TANK_HP = 3
 POWERUP_SIZE = 20
@@ -17,10 +22,53 @@ TRAP_DAMAGE = 2
 TRAP_COOLDOWN = 20  # seconds
 TRAP_MAX_ACTIVE = 2
 
-SERVER_TICK_RATE = 60  # updates per second
+SERVER_TICK_RATE = 60  # updates per second (bullets are swept, so 20-30 plays the same for less CPU)
+SPEED_TICK_RATE = 60   # tick rate the per-tick speeds are tuned for; other rates scale each step to match
+TICK_THREADS = 0       # >1 splits per-tank and per-bullet tick work across threads (free-threaded CPython only)
+
+PROFILE_TRIGGER_FILE = "profile.trigger"  # touch it (or write N into it) to cProfile the next N ticks
+PROFILE_DEFAULT_TICKS = 300
+PROFILE_OUTPUT_DIR = "profiles"
+
+METRICS_HOST = "127.0.0.1"  # Prometheus text endpoint, local only
+METRICS_PORT = 9105         # None disables the endpoint
+
+EVENT_LOG_LEVEL = "info"         # "debug" also logs every hit and pickup
+EVENT_LOG_FILE = None            # e.g. "logs/events.jsonl"; None prints to stdout
+EVENT_LOG_MAX_BYTES = 10 << 20   # rotate the JSONL file past this size
+EVENT_LOG_BACKUPS = 3
+EVENT_LOG_QUEUE_SIZE = 10000     # records buffered before new ones are dropped
+
+RECORD_DIR = None            # e.g. "recordings"; each arena writes a replayable match log there
+RECORD_CHECK_INTERVAL = 60   # ticks between state checksums in a recording
 
 SERVER_HOST = "0.0.0.0"  # for server bind
-SERVER_PORT = 5000       # port for all clients
+SERVER_PORT = 5000       # port for all clients (lobby)
+# addresses the lobby accepts on (see transport.py); add e.g. "unix:/tmp/lan_tanks.sock" for same-host bots
+SERVER_LISTEN = [f"{SERVER_HOST}:{SERVER_PORT}"]
+SOCKET_BUFFER_BYTES = 256 << 10  # SO_SNDBUF/SO_RCVBUF for TCP sockets (None keeps the OS autotuning)
+
+COMPRESSION_ENABLED = True                # accept "zlib-dict" when a client's hello offers it
+COMPRESSION_LEVEL = 1                     # zlib level; 1 keeps the per-tick cost lowest
+COMPRESSION_DICT = "assets/state.zdict"   # trained by compression.py (built-in fallback if missing)
+
+AOI_ENABLED = True    # on maps larger than the screen, send each client only what is near its view
+AOI_MARGIN = 240      # px beyond a client's view that is still sent
+AOI_CELL_SIZE = 256   # spatial index cell in px
+
+BOT_FILL = 4            # while humans play, add bots until an arena has this many tanks (0 = no bots)
+BOT_BUDGET_MS = 3.0     # wall time per tick for all bots of an arena (flow fields cost more on larger maps)
+
+RELAY_HOST = "0.0.0.0"   # relay.py: where spectators connect
+RELAY_PORT = 5001
+RELAY_MAX_VIEWERS = 1000
+
+ARENA_MAX_PLAYERS = 8    # players per match before the lobby opens another arena
+ARENA_WORKERS = 2        # worker processes hosting arenas (0 = run arenas inside the lobby process)
+
+FANOUT_WORKERS = 0          # per-arena snapshot sender processes (0 = send from the tick thread)
+FANOUT_RING_SLOTS = 4       # frames kept in the shared-memory ring
+FANOUT_SLOT_SIZE = 1 << 20  # largest frame (bytes) the ring can carry
 
 # Colors (R, G, B)
 COLOR_BG = (30, 30, 30)
@@ -33,8 +81,8 @@ COLOR_POWERUP = (255, 140, 0)
 COLOR_TRAP = (220, 60, 60)
 COLOR_WALL = (70, 80, 90)
 
-# Static obstacles (x, y, width, height)
-OBSTACLES = [
+# Static obstacles (x, y, width, height) of one screen-sized map tile
+TILE_OBSTACLES = [
     {"x": SCREEN_WIDTH // 2 - 100, "y": SCREEN_HEIGHT // 2 - 30, "w": 200, "h": 60},
     {"x": SCREEN_WIDTH // 4 - 150, "y": SCREEN_HEIGHT // 3 - 20, "w": 300, "h": 40},
     {"x": 3 * SCREEN_WIDTH // 4 - 150, "y": SCREEN_HEIGHT // 3 - 20, "w": 300, "h": 40},
@@ -43,3 +91,10 @@ OBSTACLES = [
     {"x": SCREEN_WIDTH // 2 - 30, "y": SCREEN_HEIGHT // 4 - 100, "w": 60, "h": 200},
     {"x": SCREEN_WIDTH // 2 - 30, "y": 3 * SCREEN_HEIGHT // 4 - 100, "w": 60, "h": 200},
 ]
+
+OBSTACLES = [
+    dict(ob, x=ob["x"] + tx * SCREEN_WIDTH, y=ob["y"] + ty * SCREEN_HEIGHT)
+    for ty in range(MAP_TILES_Y)
+    for tx in range(MAP_TILES_X)
+    for ob in TILE_OBSTACLES
+]
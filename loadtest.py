@@ -0,0 +1,354 @@
+# loadtest.py
+"""
+Headless load generator for the LAN Tanks server.
+
+- Opens N bot connections that speak the real line-JSON protocol
+- Bots play randomized (or scripted) inputs at configurable rates
+- Inputs carry a "seq"; the server echoes the last applied one as "ack",
+  which gives input-to-state latency without touching the client
+- --compress negotiates compressed frames, to compare bandwidth
+- --address picks the transport (see transport.py); a loopback address
+  starts the server inside this process, so no ports are involved
+- Results are printed and saved as JSON so runs can be compared
+
+Usage:
+    python loadtest.py --bots 32 --duration 30 --host 127.0.0.1
+    python loadtest.py --address unix:/tmp/lan_tanks.sock
+    python loadtest.py --address loopback:bench
+"""
+
+import argparse
+import json
+import random
+import selectors
+import threading
+import time
+
+from game_config import WORLD_WIDTH, WORLD_HEIGHT, SERVER_PORT
+import compression
+import transport
+
+DIRECTIONS = ("up", "down", "left", "right")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class Bot:
+    """
+    One simulated player: socket, protocol state and input behaviour.
+    """
+
+    def __init__(self, index, sock, rng, script=None):
+        self.index = index
+        self.sock = sock
+        self.rng = rng
+        self.script = script
+        self.player_id = None
+        self.buffer = b""
+        self.decompressor = None
+        self.seq = 0
+        self.sent_at = {}  # seq -> send time, trimmed as acks arrive
+        self.last_ack = 0
+        self.keys = {
+            "up": False, "down": False, "left": False, "right": False,
+            "shoot": False, "trap": False,
+            "mouse_pos": (WORLD_WIDTH // 2, WORLD_HEIGHT // 2),
+        }
+        self.next_input = 0.0
+        self.next_turn = 0.0
+        self.next_shot = 0.0
+        self.next_trap = 0.0
+        self.closed = False
+
+    def step_random(self, now, args):
+        keys = self.keys
+        # edge-triggered actions: release after one input so the next press counts
+        keys["shoot"] = False
+        keys["trap"] = False
+        if now >= self.next_turn:
+            for d in DIRECTIONS:
+                keys[d] = False
+            keys[self.rng.choice(DIRECTIONS)] = True
+            keys["mouse_pos"] = (self.rng.randint(0, WORLD_WIDTH), self.rng.randint(0, WORLD_HEIGHT))
+            self.next_turn = now + self.rng.expovariate(args.turn_rate) if args.turn_rate > 0 else float("inf")
+        if args.shoot_rate > 0 and now >= self.next_shot:
+            keys["shoot"] = True
+            self.next_shot = now + self.rng.expovariate(args.shoot_rate)
+        if args.trap_rate > 0 and now >= self.next_trap:
+            keys["trap"] = True
+            self.next_trap = now + self.rng.expovariate(args.trap_rate)
+
+    def step_script(self, now, start):
+        # script: list of {"t": seconds, "keys": {...}} replayed in a loop
+        period = self.script[-1]["t"] or 1.0
+        t = (now - start) % period
+        step = self.script[0]["keys"]
+        for entry in self.script:
+            if entry["t"] > t:
+                break
+            step = entry["keys"]
+        self.keys.update(step)
+        if "mouse_pos" in step:
+            self.keys["mouse_pos"] = tuple(step["mouse_pos"])
+
+    def encode_input(self, now) -> bytes:
+        self.seq += 1
+        self.sent_at[self.seq] = now
+        return (json.dumps({"type": "input", "keys": self.keys, "seq": self.seq}) + "\n").encode()
+
+
+class Stats:
+    def __init__(self):
+        self.snapshots = 0
+        self.snapshot_bytes = []
+        self.latencies = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.inputs_sent = 0
+        self.errors = 0
+        self.disconnects = 0
+
+
+def _handle_line(bot, line, now, stats, measuring, wire_size=None):
+    if line.startswith(b'{"type":"state"'):
+        if measuring:
+            stats.snapshots += 1
+            stats.snapshot_bytes.append(wire_size or len(line) + 1)
+        if bot.player_id is None:
+            return
+        # find our own player fragment instead of parsing the whole frame
+        key = b'"%d":{' % bot.player_id
+        start = line.find(key)
+        if start < 0:
+            return
+        start += len(key) - 1
+        end = line.find(b"}", start)
+        try:
+            me = json.loads(line[start:end + 1])
+        except ValueError:
+            return
+        ack = me.get("ack", 0)
+        if ack > bot.last_ack:
+            sent = bot.sent_at.get(ack)
+            if sent is not None and measuring:
+                stats.latencies.append((now - sent) * 1000.0)
+            for seq in [s for s in bot.sent_at if s <= ack]:
+                del bot.sent_at[seq]
+            bot.last_ack = ack
+        return
+
+    try:
+        msg = json.loads(line)
+    except ValueError:
+        return
+    if msg.get("type") == "init":
+        bot.player_id = msg.get("player_id")
+        if msg.get("compression") == compression.ENCODING:
+            bot.decompressor = compression.FrameDecompressor(compression.decode_dictionary(msg["zdict"]))
+
+
+def start_in_process_server(address: str, timeout: float = 5.0):
+    """
+    Run server.main on a thread listening on `address` (arenas in this
+    process) and wait until it accepts connections.
+    """
+    import server
+    threading.Thread(target=server.main, args=([address], 0), daemon=True).start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            transport.connect(address).close()
+            return
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    address = args.address or f"{args.host}:{args.port}"
+    if transport.parse_address(address)[0] == "loopback":
+        start_in_process_server(address)
+    script = None
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+
+    sel = selectors.DefaultSelector()
+    bots = []
+    stats = Stats()
+    for i in range(args.bots):
+        try:
+            sock = transport.connect(address, timeout=5)
+        except OSError as e:
+            print(f"[LOADTEST] Bot {i} failed to connect: {e}")
+            stats.errors += 1
+            continue
+        if args.compress:
+            hello = {"type": "hello", "role": "player", "compression": [compression.ENCODING]}
+            sock.sendall((json.dumps(hello) + "\n").encode())
+        sock.setblocking(False)
+        bot = Bot(i, sock, random.Random(rng.getrandbits(32)), script)
+        bots.append(bot)
+        sel.register(sock, selectors.EVENT_READ, bot)
+        if args.connect_interval > 0:
+            time.sleep(args.connect_interval)
+
+    print(f"[LOADTEST] {len(bots)} bots connected to {address}")
+
+    input_interval = 1.0 / args.input_rate
+    start = time.perf_counter()
+    measure_from = start + args.warmup
+    end = measure_from + args.duration
+
+    while True:
+        now = time.perf_counter()
+        if now >= end or all(b.closed for b in bots):
+            break
+        measuring = now >= measure_from
+
+        # send inputs that are due
+        next_due = end
+        for bot in bots:
+            if bot.closed:
+                continue
+            if now >= bot.next_input:
+                if script:
+                    bot.step_script(now, start)
+                else:
+                    bot.step_random(now, args)
+                data = bot.encode_input(now)
+                try:
+                    bot.sock.send(data)
+                    if measuring:
+                        stats.bytes_out += len(data)
+                        stats.inputs_sent += 1
+                except BlockingIOError:
+                    pass
+                except OSError:
+                    stats.errors += 1
+                bot.next_input = now + input_interval
+            next_due = min(next_due, bot.next_input)
+
+        # read snapshots until the next input is due
+        timeout = max(0.0, next_due - time.perf_counter())
+        for key, _ in sel.select(timeout):
+            bot = key.data
+            try:
+                data = bot.sock.recv(1 << 16)
+            except BlockingIOError:
+                continue
+            except OSError:
+                data = b""
+            recv_time = time.perf_counter()
+            if not data:
+                sel.unregister(bot.sock)
+                bot.sock.close()
+                bot.closed = True
+                stats.disconnects += 1
+                continue
+            if recv_time >= measure_from:
+                stats.bytes_in += len(data)
+            measuring = recv_time >= measure_from
+            if bot.decompressor is not None:
+                sizes = []
+                for frame, size in zip(bot.decompressor.feed(data, sizes), sizes):
+                    _handle_line(bot, frame, recv_time, stats, measuring, size)
+                continue
+            bot.buffer += data
+            while bot.decompressor is None and b"\n" in bot.buffer:
+                line, bot.buffer = bot.buffer.split(b"\n", 1)
+                if line:
+                    _handle_line(bot, line, recv_time, stats, measuring)
+            if bot.decompressor is not None and bot.buffer:
+                # frames that arrived in the same read as the init
+                rest, bot.buffer = bot.buffer, b""
+                sizes = []
+                for frame, size in zip(bot.decompressor.feed(rest, sizes), sizes):
+                    _handle_line(bot, frame, recv_time, stats, measuring, size)
+
+    elapsed = max(1e-9, time.perf_counter() - measure_from)
+    for bot in bots:
+        if not bot.closed:
+            sel.unregister(bot.sock)
+            bot.sock.close()
+    return build_report(args, len(bots), stats, elapsed)
+
+
+def build_report(args, connected, stats, elapsed):
+    sizes = sorted(stats.snapshot_bytes)
+    lat = sorted(stats.latencies)
+    return {
+        "config": vars(args),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "bots_connected": connected,
+        "seconds": round(elapsed, 3),
+        # every bot receives every tick of its arena, so this approximates the tick rate
+        "server_tick_rate": round(stats.snapshots / elapsed / max(1, connected), 2),
+        "snapshot_bytes": {
+            "mean": round(sum(sizes) / len(sizes), 1) if sizes else 0,
+            "p50": percentile(sizes, 50),
+            "p99": percentile(sizes, 99),
+            "max": sizes[-1] if sizes else 0,
+        },
+        "input_to_state_ms": {
+            "samples": len(lat),
+            "p50": round(percentile(lat, 50), 2),
+            "p90": round(percentile(lat, 90), 2),
+            "p99": round(percentile(lat, 99), 2),
+            "max": round(lat[-1], 2) if lat else 0.0,
+        },
+        "bytes_per_sec": {
+            "in": round(stats.bytes_in / elapsed),
+            "out": round(stats.bytes_out / elapsed),
+        },
+        "inputs_per_sec": round(stats.inputs_sent / elapsed, 1),
+        "errors": stats.errors,
+        "disconnects": stats.disconnects,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless load generator for server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--address", help="transport address instead of --host/--port (unix:..., loopback:...)")
+    parser.add_argument("--bots", type=int, default=16, help="concurrent connections")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds ignored before measuring")
+    parser.add_argument("--input-rate", type=float, default=60.0, help="inputs per second per bot")
+    parser.add_argument("--turn-rate", type=float, default=1.0, help="direction/aim changes per second")
+    parser.add_argument("--shoot-rate", type=float, default=2.0, help="shots per second")
+    parser.add_argument("--trap-rate", type=float, default=0.05, help="trap placements per second")
+    parser.add_argument("--script", help="JSON list of {t, keys} steps to loop instead of random play")
+    parser.add_argument("--compress", action="store_true", help="negotiate compressed state frames")
+    parser.add_argument("--connect-interval", type=float, default=0.0, help="delay between connects")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="result file (default loadtest_<timestamp>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    out = args.out or time.strftime("loadtest_%Y%m%d-%H%M%S.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    lat = report["input_to_state_ms"]
+    size = report["snapshot_bytes"]
+    print(f"[LOADTEST] bots={report['bots_connected']} tick~{report['server_tick_rate']}/s "
+          f"snapshot mean={size['mean']}B max={size['max']}B")
+    print(f"[LOADTEST] input->state p50={lat['p50']}ms p90={lat['p90']}ms p99={lat['p99']}ms "
+          f"in={report['bytes_per_sec']['in']}B/s out={report['bytes_per_sec']['out']}B/s")
+    print(f"[LOADTEST] saved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# metrics.py
+"""
+Minimal Prometheus-style metrics for the LAN Tanks server.
+
+- Counters, gauges and histograms with labels, kept in a per-process
+  REGISTRY (arena worker processes push theirs to the lobby)
+- collect() returns plain data that pickles across process pipes;
+  render() turns merged families into the Prometheus text format
+- serve() exposes the text on a local HTTP endpoint
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}  # label values tuple -> child
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._children.pop(key, None)
+
+    # unlabelled metrics use a single child
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._children.items())
+        for key, child in items:
+            labels = dict(zip(self.labelnames, key))
+            yield from child.samples(labels)
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, labels):
+        yield "", labels, self.value
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for i, bound in enumerate(self.bounds):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            self.sum += value
+            self.count += 1
+
+    def samples(self, labels):
+        cumulative = 0
+        for bound, c in zip(self.bounds, self.counts):
+            cumulative += c
+            yield "_bucket", dict(labels, le=_format_value(float(bound))), cumulative
+        yield "_bucket", dict(labels, le="+Inf"), self.count
+        yield "_sum", labels, self.sum
+        yield "_count", labels, self.count
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=(0.001, 0.005, 0.01, 0.05, 0.1)):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=None):
+        if buckets is None:
+            return self._register(Histogram(name, help_text, labelnames))
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def add_collector(self, fn):
+        """
+        fn() runs right before each collect(); use it for values that are
+        cheaper to sample on demand than to keep updated (e.g. queue depths).
+        """
+        with self._lock:
+            self._collectors.append(fn)
+
+    def remove_collector(self, fn):
+        with self._lock:
+            if fn in self._collectors:
+                self._collectors.remove(fn)
+
+    def collect(self) -> dict:
+        """
+        name -> {"type", "help", "samples": [(suffix, labels, value), ...]}
+        """
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics)
+        for fn in collectors:
+            try:
+                fn()
+            except Exception:
+                pass
+        return {
+            m.name: {"type": m.type_name, "help": m.help, "samples": list(m._samples())}
+            for m in metrics
+        }
+
+
+def merge(*collections) -> dict:
+    merged = {}
+    for families in collections:
+        for name, fam in families.items():
+            entry = merged.setdefault(name, {"type": fam["type"], "help": fam["help"], "samples": []})
+            entry["samples"].extend(fam["samples"])
+    return merged
+
+
+def render(families: dict) -> str:
+    lines = []
+    for name in sorted(families):
+        fam = families[name]
+        lines.append(f"# HELP {name} {fam['help']}")
+        lines.append(f"# TYPE {name} {fam['type']}")
+        for suffix, labels, value in fam["samples"]:
+            lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def serve(host: str, port: int, collect):
+    """
+    Serve `collect()` (merged families) as Prometheus text on /metrics in
+    a daemon thread. Returns the server so callers can shut it down.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render(collect()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
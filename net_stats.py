@@ -0,0 +1,172 @@
+# net_stats.py
+"""
+Client-side connection telemetry for LAN Tanks.
+
+- RTT from ping/pong: the server queues a pong until its next state
+  frame goes out and stamps when it received the ping ("rx"); the frame
+  that follows carries the server "time" it was sent, so the time the
+  pong waited on the server is subtracted without syncing clocks
+- Snapshot jitter (RFC 3550 style): how much frame arrival spacing
+  differs from the spacing of their server timestamps
+- Dropped frames from gaps in the server "tick" stamps, late frames from
+  arrivals more than a tick behind their spacing
+- Snapshot age at render time, bytes/s both ways, the server's own tick
+  interval and the client's FPS, so network, server and render problems
+  can be told apart
+- Optional CSV log, one row per second
+"""
+
+import collections
+import time
+
+PING_INTERVAL = 0.5   # seconds between pings
+ROLLUP_INTERVAL = 1.0  # seconds per rate window / CSV row
+
+CSV_FIELDS = (
+    "time", "rtt_ms", "jitter_ms", "age_ms", "fps", "frames_per_s", "dropped", "late",
+    "bytes_in_per_s", "bytes_out_per_s", "server_tick_ms",
+)
+
+
+class NetStats:
+    """
+    Fed by the network thread (on_bytes_in, on_snapshot, on_pong) and the
+    game loop (on_bytes_out, on_render); read by the net graph.
+    """
+
+    def __init__(self, tick_rate: float, history: int = 120, csv_path: str = None):
+        """
+        :param tick_rate: the server's nominal ticks per second
+        :param history: frame intervals kept for the graph
+        :param csv_path: append one summary row per second to this file
+        """
+        self.tick_ms = 1000.0 / tick_rate
+        self.rtt_ms = None        # smoothed round trip
+        self.rtt_last_ms = None
+        self.jitter_ms = 0.0
+        self.age_ms = None        # how old the snapshot on screen was when drawn
+        self.fps = 0.0
+        self.server_tick_ms = None
+        self.frames = 0
+        self.dropped = 0
+        self.late = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.in_rate = 0.0
+        self.out_rate = 0.0
+        self.frame_rate = 0.0
+        self.intervals = collections.deque(maxlen=history)  # (arrival gap ms, late)
+
+        self._last_tick = None
+        self._last_server_time = None
+        self._last_arrival = None
+        self._pong = None         # (round trip incl. server wait, server rx time)
+        self._next_ping = 0.0
+        self._window_start = time.perf_counter()
+        self._window_counts = (0, 0, 0)  # bytes in, bytes out, frames at window start
+
+        self._csv_file = None
+        self._csv = None
+        if csv_path:
+            import csv  # only with --netlog; keeps client start-up lean
+
+            self._csv_file = open(csv_path, "a", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._csv_file)
+            if self._csv_file.tell() == 0:
+                self._csv.writerow(CSV_FIELDS)
+
+    # -- network thread ------------------------------------------------------
+
+    def on_bytes_in(self, n: int):
+        self.bytes_in += n
+
+    def on_connect(self):
+        # a new match (or relay switch) restarts tick numbering
+        self._last_tick = self._last_server_time = self._last_arrival = None
+        self._pong = None
+
+    def on_pong(self, msg: dict, arrival: float):
+        sent = msg.get("t")
+        if isinstance(sent, (int, float)):
+            self._pong = ((arrival - sent) * 1000.0, msg.get("rx"))
+
+    def on_snapshot(self, tick, server_time, arrival: float):
+        self.frames += 1
+        if not isinstance(tick, int) or not isinstance(server_time, (int, float)):
+            return  # server without stamps
+        if self._pong is not None:
+            raw_ms, rx = self._pong
+            self._pong = None
+            held_ms = (server_time - rx) * 1000.0 if isinstance(rx, (int, float)) else 0.0
+            rtt = max(0.0, raw_ms - max(0.0, held_ms))
+            self.rtt_last_ms = rtt
+            self.rtt_ms = rtt if self.rtt_ms is None else self.rtt_ms + (rtt - self.rtt_ms) / 8
+        if self._last_tick is not None and tick > self._last_tick:
+            gap_ms = (arrival - self._last_arrival) * 1000.0
+            server_gap_ms = (server_time - self._last_server_time) * 1000.0
+            ticks = tick - self._last_tick
+            self.dropped += ticks - 1
+            d = gap_ms - server_gap_ms
+            self.jitter_ms += (abs(d) - self.jitter_ms) / 16
+            late = d > self.tick_ms
+            if late:
+                self.late += 1
+            self.intervals.append((gap_ms, late))
+            per_tick = server_gap_ms / ticks
+            self.server_tick_ms = (per_tick if self.server_tick_ms is None
+                                   else self.server_tick_ms + (per_tick - self.server_tick_ms) / 16)
+        self._last_tick = tick
+        self._last_server_time = server_time
+        self._last_arrival = arrival
+
+    # -- game loop -----------------------------------------------------------
+
+    def ping_due(self, now: float) -> bool:
+        if now < self._next_ping:
+            return False
+        self._next_ping = now + PING_INTERVAL
+        return True
+
+    def ping_message(self, now: float) -> dict:
+        return {"type": "ping", "t": now}
+
+    def on_bytes_out(self, n: int):
+        self.bytes_out += n
+
+    def on_render(self, received: float, now: float, fps: float):
+        """
+        Called once per drawn frame with the arrival time of the snapshot
+        being drawn (None before the first one).
+        """
+        self.fps = fps
+        if received is not None:
+            # time spent on this side, plus the estimated one-way trip to get here
+            self.age_ms = (now - received) * 1000.0 + (self.rtt_ms or 0.0) / 2
+        elapsed = now - self._window_start
+        if elapsed >= ROLLUP_INTERVAL:
+            b_in, b_out, frames = self._window_counts
+            self.in_rate = (self.bytes_in - b_in) / elapsed
+            self.out_rate = (self.bytes_out - b_out) / elapsed
+            self.frame_rate = (self.frames - frames) / elapsed
+            self._window_start = now
+            self._window_counts = (self.bytes_in, self.bytes_out, self.frames)
+            self._write_row()
+
+    def _write_row(self):
+        if self._csv is None:
+            return
+
+        def fmt(v):
+            return "" if v is None else round(v, 2)
+
+        self._csv.writerow((
+            time.strftime("%Y-%m-%dT%H:%M:%S"), fmt(self.rtt_ms), fmt(self.jitter_ms), fmt(self.age_ms),
+            fmt(self.fps), fmt(self.frame_rate), self.dropped, self.late,
+            round(self.in_rate), round(self.out_rate), fmt(self.server_tick_ms),
+        ))
+        self._csv_file.flush()
+
+    def close(self):
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = self._csv = None
@@ -0,0 +1,78 @@
+# parallel_tick.py
+"""
+Optional parallel tick phases for free-threaded CPython (3.13t).
+
+- TickPool.map runs a per-item function over a batch on a thread pool,
+  one contiguous chunk per thread, and returns the results in item order
+- The arena only maps work that touches nothing but the item itself
+  (its own tank, its own bullet) or reads the world; everything that
+  changes shared state (damage, deaths, the entity pools) is applied
+  afterwards on the tick thread, in item order, so a parallel tick ends
+  in exactly the state a serial one would
+- With the GIL enabled threads cannot run Python code side by side, so
+  make_pool only returns a pool on free-threaded builds
+"""
+
+import concurrent.futures
+import sys
+
+
+def free_threading() -> bool:
+    """
+    True when this interpreter is running without the GIL.
+    """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+class TickPool:
+    """
+    Thread pool shared by the arenas of one process.
+    """
+
+    def __init__(self, threads: int, min_chunk: int = 64):
+        """
+        :param threads: worker threads (the calling thread only waits)
+        :param min_chunk: smallest slice worth handing to a thread; smaller batches run inline
+        """
+        self.threads = threads
+        self.min_chunk = min_chunk
+        self._executor = concurrent.futures.ThreadPoolExecutor(threads, thread_name_prefix="tick")
+
+    def map(self, fn, items) -> list:
+        """
+        [fn(item) for item in items], split across the pool when the batch
+        is large enough. fn must not modify anything other than its item.
+        """
+        n = len(items)
+        chunks = min(self.threads, n // self.min_chunk)
+        if chunks < 2:
+            return [fn(item) for item in items]
+        size = -(-n // chunks)
+        futures = [
+            self._executor.submit(_run_chunk, fn, items[start:start + size])
+            for start in range(0, n, size)
+        ]
+        out = []
+        for f in futures:
+            out.extend(f.result())
+        return out
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def _run_chunk(fn, chunk):
+    return [fn(item) for item in chunk]
+
+
+def make_pool(threads: int, min_chunk: int = 64):
+    """
+    A TickPool when `threads` > 1 and the GIL is off, else None (serial ticks).
+    """
+    if threads <= 1:
+        return None
+    if not free_threading():
+        print(f"[SERVER] TICK_THREADS={threads} ignored: this Python has the GIL enabled")
+        return None
+    return TickPool(threads, min_chunk)
@@ -0,0 +1,242 @@
+# recording.py
+"""
+Compact binary match recordings.
+
+- A recording is the arena's RNG seed and starting state plus every join,
+  leave, input change and tick time, in the order the arena applied them;
+  replaying those through Arena.update_game rebuilds the match exactly
+- The tick thread only packs a few bytes per tick into a queue; a
+  background thread does the buffered file writes
+- Every RECORD_CHECK_INTERVAL ticks a CRC of the encoded state is stored
+  so a replay can prove it stayed in sync
+- Recording files are read through mmap (see replay.py)
+
+File layout: b"TNKREC" + u16 version + u32 header length + JSON header,
+then records, each starting with a one-byte kind.
+"""
+
+import collections
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from game_config import SCREEN_WIDTH, SCREEN_HEIGHT, WORLD_WIDTH, WORLD_HEIGHT, SERVER_TICK_RATE, TANK_SPEED
+
+MAGIC = b"TNKREC"
+VERSION = 2  # 2: swept bullet collision (version 1 matches no longer replay in sync)
+_FILE_HEADER = struct.Struct("<6sHI")
+
+REC_TICK = 1    # <d now: run one update_game at this clock value
+REC_JOIN = 2    # <I pid
+REC_LEAVE = 3   # <I pid
+REC_INPUT = 4   # <IHI pid, key flags, seq; then <ii or <dd mouse when flagged
+REC_CHECK = 5   # <I crc32 of encode_state(now) after the preceding tick
+
+_KIND = struct.Struct("<B")
+_TICK = struct.Struct("<Bd")
+_PID = struct.Struct("<BI")
+_INPUT = struct.Struct("<BIHI")
+_MOUSE_INT = struct.Struct("<ii")
+_MOUSE_FLOAT = struct.Struct("<dd")
+_CHECK = struct.Struct("<BI")
+
+# input flag bits; only truthiness of the keys matters to the simulation
+_KEY_BITS = (("up", 1), ("down", 2), ("left", 4), ("right", 8), ("shoot", 16), ("trap", 32))
+_HAS_MOUSE = 64
+_MOUSE_IS_FLOAT = 128
+_HAS_SEQ = 256
+
+_I32 = 1 << 31
+
+
+def encode_input(pid: int, keys: dict, seq) -> bytes:
+    flags = 0
+    for name, bit in _KEY_BITS:
+        if keys.get(name):
+            flags |= bit
+    mouse = b""
+    mouse_pos = keys.get("mouse_pos")
+    if isinstance(mouse_pos, (list, tuple)) and len(mouse_pos) == 2:
+        mx, my = mouse_pos
+        if (type(mx) is int and type(my) is int
+                and -_I32 <= mx < _I32 and -_I32 <= my < _I32):
+            flags |= _HAS_MOUSE
+            mouse = _MOUSE_INT.pack(mx, my)
+        elif isinstance(mx, (int, float)) and isinstance(my, (int, float)):
+            flags |= _HAS_MOUSE | _MOUSE_IS_FLOAT
+            mouse = _MOUSE_FLOAT.pack(mx, my)
+    if seq is not None:
+        flags |= _HAS_SEQ
+    return _INPUT.pack(REC_INPUT, pid, flags, (seq or 0) & 0xFFFFFFFF) + mouse
+
+
+class MatchRecorder:
+    """
+    Append-only recording of one arena. Hooks are called by the arena with
+    its lock held, so records land in exactly the order they were applied.
+    """
+
+    def __init__(self, path: str, seed: int, check_interval: int = 60, flush_interval: float = 0.5):
+        """
+        :param path: file to create (parent directories are created)
+        :param seed: seed the arena's random.Random was created with
+        :param check_interval: ticks between state checksums (0 disables them)
+        :param flush_interval: seconds the writer sleeps between batches
+        """
+        self.path = path
+        self.seed = seed
+        self.check_interval = check_interval
+        self.flush_interval = flush_interval
+        self.ticks = 0
+        self.bytes_written = 0
+        self._last_inputs = {}  # pid -> last encoded input record
+        self._chunks = collections.deque()
+        self._stop = threading.Event()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "wb", buffering=1 << 16)
+        self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+
+    def begin(self, arena):
+        """
+        Write the file header from a freshly created arena.
+        """
+        header = json.dumps({
+            "arena_id": arena.arena_id,
+            "seed": self.seed,
+            "started": time.time(),
+            "tick_rate": SERVER_TICK_RATE,
+            "screen": [SCREEN_WIDTH, SCREEN_HEIGHT],
+            "world": [WORLD_WIDTH, WORLD_HEIGHT],
+            "tank_speed": TANK_SPEED,
+            "next_player_id": arena.next_player_id,
+            "next_powerup_id": arena.next_powerup_id,
+            "last_powerup_spawn": arena.last_powerup_spawn,
+        }).encode()
+        self._chunks.append(_FILE_HEADER.pack(MAGIC, VERSION, len(header)) + header)
+        self._thread.start()
+
+    # -- hooks (arena lock held) ---------------------------------------------
+
+    def join(self, pid: int):
+        self._chunks.append(_PID.pack(REC_JOIN, pid))
+
+    def leave(self, pid: int):
+        self._last_inputs.pop(pid, None)
+        self._chunks.append(_PID.pack(REC_LEAVE, pid))
+
+    def tick(self, now: float, inputs: dict, input_seqs: dict):
+        """
+        Record inputs that changed since the previous tick, then the tick.
+        """
+        last = self._last_inputs
+        parts = []
+        for pid, keys in inputs.items():
+            rec = encode_input(pid, keys, input_seqs.get(pid))
+            if last.get(pid) != rec:
+                last[pid] = rec
+                parts.append(rec)
+        parts.append(_TICK.pack(REC_TICK, now))
+        self._chunks.append(b"".join(parts))
+        self.ticks += 1
+
+    def check_due(self) -> bool:
+        return self.check_interval > 0 and self.ticks % self.check_interval == 0
+
+    def check(self, state: bytes):
+        self._chunks.append(_CHECK.pack(REC_CHECK, zlib.crc32(state)))
+
+    # -- writer --------------------------------------------------------------
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+
+    def _drain(self):
+        chunks = self._chunks
+        batch = []
+        while chunks:
+            try:
+                batch.append(chunks.popleft())
+            except IndexError:
+                break
+        if not batch:
+            return
+        data = b"".join(batch)
+        try:
+            self._file.write(data)
+            self._file.flush()
+            self.bytes_written += len(data)
+        except (OSError, ValueError):
+            pass
+
+    def close(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._drain()
+        self._file.close()
+
+
+class Recording:
+    """
+    Read-only view of a recording file through mmap.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_len = _FILE_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a match recording")
+        if version != VERSION:
+            raise ValueError(f"{path} has recording version {version}, expected {VERSION}")
+        start = _FILE_HEADER.size
+        self.header = json.loads(self._map[start:start + header_len])
+        self._records_start = start + header_len
+
+    def records(self):
+        """
+        Yield (kind, *values). A truncated last record (server killed while
+        writing) ends the iteration instead of raising.
+        """
+        buf = self._map
+        pos = self._records_start
+        end = len(buf)
+        try:
+            while pos < end:
+                kind = buf[pos]
+                if kind == REC_TICK:
+                    _, now = _TICK.unpack_from(buf, pos)
+                    pos += _TICK.size
+                    yield REC_TICK, now
+                elif kind == REC_INPUT:
+                    _, pid, flags, seq = _INPUT.unpack_from(buf, pos)
+                    pos += _INPUT.size
+                    keys = {name: bool(flags & bit) for name, bit in _KEY_BITS}
+                    if flags & _HAS_MOUSE:
+                        mouse = _MOUSE_FLOAT if flags & _MOUSE_IS_FLOAT else _MOUSE_INT
+                        keys["mouse_pos"] = mouse.unpack_from(buf, pos)
+                        pos += mouse.size
+                    yield REC_INPUT, pid, keys, (seq if flags & _HAS_SEQ else None)
+                elif kind in (REC_JOIN, REC_LEAVE):
+                    _, pid = _PID.unpack_from(buf, pos)
+                    pos += _PID.size
+                    yield kind, pid
+                elif kind == REC_CHECK:
+                    _, crc = _CHECK.unpack_from(buf, pos)
+                    pos += _CHECK.size
+                    yield REC_CHECK, crc
+                else:
+                    raise ValueError(f"{self.path}: unknown record kind {kind} at byte {pos}")
+        except struct.error:
+            return
+
+    def close(self):
+        self._map.close()
@@ -0,0 +1,270 @@
+# relay.py
+"""
+Spectator relay for LAN Tanks.
+
+- Subscribes to the server once, as a spectator of one arena
+- Re-broadcasts the server's already-encoded frames byte for byte to any
+  number of viewers (client.py --spectate); nothing is parsed or re-encoded
+- Single thread, non-blocking sockets: a slow viewer skips to the newest
+  frame instead of buffering, so it never delays the others
+- Reconnects when the match ends and hands viewers the next one
+
+Usage:
+    python relay.py <server-ip> [--arena N] [--port 5001]
+    python relay.py unix:/tmp/lan_tanks.sock       # any transport.py address
+    python client.py <relay-ip>:5001 --spectate
+"""
+
+import argparse
+import json
+import selectors
+import socket
+import time
+
+from game_config import SERVER_PORT, RELAY_HOST, RELAY_PORT, RELAY_MAX_VIEWERS
+import transport
+
+RETRY_INTERVAL = 2.0  # seconds between attempts to (re)subscribe upstream
+STATS_INTERVAL = 10.0
+
+_LISTENER = object()
+_UPSTREAM = object()
+
+
+class Viewer:
+    __slots__ = ("sock", "addr", "out", "next_frame", "writing", "dropped")
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.out = None         # memoryview of the frame(s) being sent
+        self.next_frame = None  # newest frame waiting behind `out`
+        self.writing = False    # EVENT_WRITE registered
+        self.dropped = 0
+
+
+class Relay:
+    def __init__(self, server: str, arena=None, listen: tuple = (RELAY_HOST, RELAY_PORT),
+                 max_viewers: int = RELAY_MAX_VIEWERS):
+        """
+        :param server: transport address of the game server's lobby
+        :param arena: arena id to watch; None lets the lobby pick the busiest
+        :param listen: (host, port) viewers connect to
+        :param max_viewers: connections beyond this are refused
+        """
+        self.server = server
+        self.arena = arena
+        self.max_viewers = max_viewers
+        self.sel = selectors.DefaultSelector()
+        self.viewers = {}  # socket -> Viewer
+        self.upstream = None
+        self.buffer = b""
+        self.init_line = b'{"type":"init","player_id":null,"player_uid":null,"spectator":true}\n'
+        self.next_retry = 0.0
+
+        self.frames_in = 0
+        self.bytes_out = 0
+        self.dropped = 0
+
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(listen)
+        self.listener.listen(128)
+        self.listener.setblocking(False)
+        self.sel.register(self.listener, selectors.EVENT_READ, _LISTENER)
+
+    # -- upstream ------------------------------------------------------------
+
+    def _subscribe(self):
+        self.next_retry = time.monotonic() + RETRY_INTERVAL
+        sock = None
+        try:
+            sock = transport.connect(self.server, timeout=RETRY_INTERVAL)
+            sock.settimeout(RETRY_INTERVAL)
+            hello = {"type": "hello", "role": "spectator"}
+            if self.arena is not None:
+                hello["arena"] = self.arena
+            sock.sendall((json.dumps(hello) + "\n").encode())
+            # the first line is our init (or an error); read it whole
+            first = b""
+            while b"\n" not in first:
+                data = sock.recv(4096)
+                if not data:
+                    raise ConnectionError("closed during handshake")
+                first += data
+            line, rest = first.split(b"\n", 1)
+            msg = json.loads(line)
+            if not isinstance(msg, dict):
+                raise ValueError(f"unexpected handshake {line[:80]!r}")
+        except OSError:
+            if sock is not None:
+                sock.close()
+            return
+        except ValueError as e:
+            # not a game server, or a garbled line: drop it and retry later
+            print(f"[RELAY] Bad handshake from {self.server}: {e}")
+            sock.close()
+            return
+        if msg.get("type") != "init":
+            print(f"[RELAY] Server refused: {msg.get('reason', line.decode())}")
+            sock.close()
+            return
+        print(f"[RELAY] Subscribed to arena {msg.get('arena')} on {self.server}")
+        sock.setblocking(False)
+        self.upstream = sock
+        self.buffer = b""
+        self.init_line = line + b"\n"
+        self.sel.register(sock, selectors.EVENT_READ, _UPSTREAM)
+        # viewers already watching switch to the new match
+        self._publish(self.init_line)
+        if rest:
+            self._on_upstream_data(rest)
+
+    def _read_upstream(self):
+        try:
+            data = self.upstream.recv(1 << 18)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            print("[RELAY] Upstream closed; waiting for the next match")
+            self.sel.unregister(self.upstream)
+            self.upstream.close()
+            self.upstream = None
+            self.next_retry = time.monotonic() + RETRY_INTERVAL
+            return
+        self._on_upstream_data(data)
+
+    def _on_upstream_data(self, data):
+        buf = self.buffer + data
+        end = buf.rfind(b"\n")
+        if end < 0:
+            self.buffer = buf
+            return
+        chunk, self.buffer = buf[:end + 1], buf[end + 1:]
+        self.frames_in += chunk.count(b"\n")
+        self._publish(chunk)
+
+    # -- viewers -------------------------------------------------------------
+
+    def _publish(self, chunk: bytes):
+        """
+        Queue whole frames for every viewer. Idle viewers get everything;
+        a viewer still sending keeps only the newest frame.
+        """
+        newest = None
+        for viewer in list(self.viewers.values()):
+            if viewer.out is None:
+                viewer.out = memoryview(chunk)
+                self._flush(viewer)
+            else:
+                if newest is None:
+                    newest = chunk[chunk.rfind(b"\n", 0, len(chunk) - 1) + 1:]
+                if viewer.next_frame is not None:
+                    viewer.dropped += 1
+                    self.dropped += 1
+                viewer.next_frame = newest
+
+    def _flush(self, viewer: Viewer):
+        while viewer.out is not None:
+            try:
+                sent = viewer.sock.send(viewer.out)
+            except BlockingIOError:
+                break
+            except OSError:
+                self._drop_viewer(viewer)
+                return
+            self.bytes_out += sent
+            if sent < len(viewer.out):
+                viewer.out = viewer.out[sent:]
+                continue
+            viewer.out = memoryview(viewer.next_frame) if viewer.next_frame is not None else None
+            viewer.next_frame = None
+        want_write = viewer.out is not None
+        if want_write != viewer.writing:
+            viewer.writing = want_write
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if want_write else 0)
+            self.sel.modify(viewer.sock, events, viewer)
+
+    def _accept(self):
+        try:
+            sock, addr = self.listener.accept()
+        except BlockingIOError:
+            return
+        if len(self.viewers) >= self.max_viewers:
+            sock.close()
+            return
+        sock.setblocking(False)
+        transport.tune(sock)
+        viewer = Viewer(sock, addr)
+        self.viewers[sock] = viewer
+        self.sel.register(sock, selectors.EVENT_READ, viewer)
+        viewer.out = memoryview(self.init_line)
+        self._flush(viewer)
+
+    def _read_viewer(self, viewer: Viewer):
+        try:
+            data = viewer.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop_viewer(viewer)
+        # anything a viewer sends (inputs from client.py) is ignored
+
+    def _drop_viewer(self, viewer: Viewer):
+        if self.viewers.pop(viewer.sock, None) is None:
+            return
+        self.sel.unregister(viewer.sock)
+        viewer.sock.close()
+
+    # -- loop ----------------------------------------------------------------
+
+    def run(self):
+        last_stats = time.monotonic()
+        last_bytes = 0
+        while True:
+            now = time.monotonic()
+            if self.upstream is None and now >= self.next_retry:
+                self._subscribe()
+            for key, mask in self.sel.select(timeout=0.5):
+                if key.data is _LISTENER:
+                    self._accept()
+                elif key.data is _UPSTREAM:
+                    self._read_upstream()
+                else:
+                    viewer = key.data
+                    if mask & selectors.EVENT_READ:
+                        self._read_viewer(viewer)
+                    if mask & selectors.EVENT_WRITE and viewer.sock in self.viewers:
+                        self._flush(viewer)
+            now = time.monotonic()
+            if now - last_stats >= STATS_INTERVAL:
+                rate = (self.bytes_out - last_bytes) / (now - last_stats)
+                print(f"[RELAY] viewers={len(self.viewers)} frames={self.frames_in} "
+                      f"dropped={self.dropped} out={rate / 1024:.0f} KiB/s")
+                last_stats, last_bytes = now, self.bytes_out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-broadcast one arena to many spectators")
+    parser.add_argument("server", nargs="?", default="127.0.0.1", help="game server address (ip or transport address)")
+    parser.add_argument("--server-port", type=int, default=SERVER_PORT)
+    parser.add_argument("--arena", type=int, help="arena to watch (default: the busiest)")
+    parser.add_argument("--host", default=RELAY_HOST)
+    parser.add_argument("--port", type=int, default=RELAY_PORT)
+    args = parser.parse_args(argv)
+
+    server = args.server if ":" in args.server else f"{args.server}:{args.server_port}"
+    relay = Relay(server, args.arena, (args.host, args.port))
+    print(f"[RELAY] Viewers connect to {args.host}:{args.port}")
+    try:
+        relay.run()
+    except KeyboardInterrupt:
+        print("\n[RELAY] Shutting down.")
+
+
+if __name__ == "__main__":
+    main()
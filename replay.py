@@ -0,0 +1,230 @@
+# replay.py
+"""
+Replay a match recording (see recording.py).
+
+- Headless: re-runs Arena.update_game as fast as it can and reports tick
+  timings, so a recorded match doubles as a repeatable benchmark workload
+- --serve: plays the match back at recorded speed to client.py viewers
+  (they connect like to a normal server; their inputs are ignored)
+- State checksums stored in the recording are verified along the way
+
+Usage:
+    python replay.py recordings/arena1_20250101-120000.tnkrec
+    python replay.py match.tnkrec --json replay.json
+    python replay.py match.tnkrec --serve --speed 2 --follow 3
+"""
+
+import argparse
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import zlib
+
+from game_config import SERVER_PORT, SERVER_TICK_RATE, WORLD_WIDTH, WORLD_HEIGHT, TANK_SPEED
+from arena import Arena
+from bench import FakeClock, _distribution
+from event_log import EVENTS, LEVELS
+from recording import Recording, REC_TICK, REC_JOIN, REC_LEAVE, REC_INPUT, REC_CHECK
+
+
+class Replayer:
+    """
+    Rebuilds an arena from a recording one tick at a time.
+    """
+
+    def __init__(self, recording: Recording):
+        header = recording.header
+        # the simulation reads these from game_config, so a match recorded with
+        # other values would drift out of sync a few ticks in; refuse it up front
+        expected = {
+            "tick_rate": SERVER_TICK_RATE,
+            "world": [WORLD_WIDTH, WORLD_HEIGHT],
+            "tank_speed": TANK_SPEED,
+        }
+        for key, value in expected.items():
+            if header.get(key) != value:
+                raise ValueError(f"{recording.path} was recorded with {key}={header.get(key)}, "
+                                 f"game_config has {value}; restore that setting to replay it")
+        self.header = header
+        self.clock = FakeClock(header["started"])
+        self.arena = Arena(header["arena_id"], rng=random.Random(header["seed"]), clock=self.clock)
+        self.arena.next_player_id = header["next_player_id"]
+        self.arena.next_powerup_id = header["next_powerup_id"]
+        self.arena.last_powerup_spawn = header["last_powerup_spawn"]
+        self.ticks = 0
+        self.checks = 0
+        self.mismatches = 0
+        self.first_now = None
+        self.now = None
+        self._records = recording.records()
+
+    def step(self) -> bool:
+        """
+        Apply records up to and including the next tick. False once the
+        recording is exhausted.
+        """
+        arena = self.arena
+        for rec in self._records:
+            kind = rec[0]
+            if kind == REC_TICK:
+                now = rec[1]
+                dt = now - self.now if self.now is not None else 0.0
+                if self.first_now is None:
+                    self.first_now = now
+                self.now = now
+                self.clock.now = now
+                arena.update_game(dt)
+                self.ticks += 1
+                return True
+            if kind == REC_INPUT:
+                _, pid, keys, seq = rec
+                arena.inputs[pid] = keys
+                if seq is not None:
+                    arena.input_seqs[pid] = seq
+            elif kind == REC_JOIN:
+                pid = arena.add_player()
+                if pid != rec[1]:
+                    raise ValueError(f"replay out of sync: joined as player {pid}, recorded {rec[1]}")
+            elif kind == REC_LEAVE:
+                arena.remove_player(rec[1])
+            elif kind == REC_CHECK:
+                self.checks += 1
+                if zlib.crc32(arena.encode_state(self.now)) != rec[1]:
+                    self.mismatches += 1
+                    if self.mismatches == 1:
+                        print(f"[REPLAY] State checksum mismatch at tick {self.ticks}")
+        return False
+
+
+def run_headless(replayer: Replayer, max_ticks: int = 0):
+    update_ms = []
+    start = time.perf_counter()
+    while not max_ticks or replayer.ticks < max_ticks:
+        t0 = time.perf_counter()
+        if not replayer.step():
+            break
+        update_ms.append((time.perf_counter() - t0) * 1000.0)
+    wall = time.perf_counter() - start
+    match_seconds = (replayer.now - replayer.first_now) if replayer.ticks else 0.0
+    return {
+        "ticks": replayer.ticks,
+        "match_seconds": round(match_seconds, 3),
+        "wall_seconds": round(wall, 3),
+        "ticks_per_sec": round(replayer.ticks / wall, 1) if wall > 0 else 0.0,
+        "speedup": round(match_seconds / wall, 1) if wall > 0 else 0.0,
+        "update_ms": _distribution(update_ms) if update_ms else {},
+        "checks": replayer.checks,
+        "mismatches": replayer.mismatches,
+        "final_counts": replayer.arena.entity_counts(),
+    }
+
+
+def serve(replayer: Replayer, host: str, port: int, speed: float, follow: int):
+    """
+    Stream the replay to any client.py that connects, paced like the
+    original match. Waits for the first viewer before starting.
+    """
+    viewers = []
+    viewers_lock = threading.Lock()
+    first_viewer = threading.Event()
+
+    def drain(conn):
+        # inputs from viewers are read and discarded so their send buffers never fill
+        try:
+            while conn.recv(4096):
+                pass
+        except OSError:
+            pass
+
+    def accept_loop(listener):
+        while True:
+            conn, addr = listener.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            player = replayer.arena.players.get(follow)
+            init_msg = {"type": "init", "player_id": follow, "player_uid": player.uid if player else None}
+            try:
+                conn.sendall((json.dumps(init_msg) + "\n").encode())
+            except OSError:
+                conn.close()
+                continue
+            print(f"[REPLAY] Viewer connected from {addr}")
+            threading.Thread(target=drain, args=(conn,), daemon=True).start()
+            with viewers_lock:
+                viewers.append(conn)
+            first_viewer.set()
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen()
+    threading.Thread(target=accept_loop, args=(listener,), daemon=True).start()
+    print(f"[REPLAY] Waiting for a viewer on {host}:{port} ...")
+    first_viewer.wait()
+
+    start_wall = time.perf_counter()
+    while replayer.step():
+        due = start_wall + (replayer.now - replayer.first_now) / speed
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        arena = replayer.arena
+        data = arena.encode_state(replayer.now, arena.state_head(replayer.now))
+        with viewers_lock:
+            for conn in list(viewers):
+                try:
+                    conn.sendall(data)
+                except OSError:
+                    viewers.remove(conn)
+                    conn.close()
+    print(f"[REPLAY] End of recording after {replayer.ticks} ticks")
+    listener.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded match")
+    parser.add_argument("recording")
+    parser.add_argument("--ticks", type=int, default=0, help="stop after this many ticks (0 = all)")
+    parser.add_argument("--json", help="write the headless report to this file")
+    parser.add_argument("--events", action="store_true", help="print game events while replaying")
+    parser.add_argument("--serve", action="store_true", help="stream to client.py viewers instead")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed for --serve")
+    parser.add_argument("--follow", type=int, default=1, help="player id the viewers' HUD follows")
+    args = parser.parse_args(argv)
+
+    if not args.events:
+        EVENTS.min_level = LEVELS["error"] + 1
+
+    recording = Recording(args.recording)
+    header = recording.header
+    print(f"[REPLAY] {args.recording}: arena {header['arena_id']}, seed {header['seed']}, "
+          f"recorded {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(header['started']))}")
+    replayer = Replayer(recording)
+
+    if args.serve:
+        serve(replayer, args.host, args.port, args.speed, args.follow)
+        return 1 if replayer.mismatches else 0
+
+    report = run_headless(replayer, args.ticks)
+    upd = report["update_ms"]
+    print(f"[REPLAY] {report['ticks']} ticks ({report['match_seconds']} s of play) in "
+          f"{report['wall_seconds']} s: {report['ticks_per_sec']} ticks/s, {report['speedup']}x real time")
+    if upd:
+        print(f"[REPLAY] update_game mean {upd['mean']:.3f} ms p50 {upd['p50']:.3f} p99 {upd['p99']:.3f} "
+              f"max {upd['max']:.3f}")
+    print(f"[REPLAY] {report['checks']} checksums verified, {report['mismatches']} mismatched")
+    if args.json:
+        report["recording"] = args.recording
+        report["header"] = header
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[REPLAY] saved {args.json}")
+    return 1 if report["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
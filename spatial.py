@@ -0,0 +1,136 @@
+# spatial.py
+"""
+Uniform-grid spatial index over the world.
+
+- Entities are bucketed by position into square cells; a rectangle query
+  only visits the cells it overlaps, so its cost follows what is near the
+  rectangle rather than the size of the map
+- Rebuilt from scratch when needed (clear + insert), which is cheaper
+  than tracking moves for entities that all move every tick
+- BoxGrid is the static counterpart for boxes (walls): each box is listed
+  in every cell it overlaps, built once
+- view_origin is the camera rule shared by the client (what it draws)
+  and the server (what it sends), so both agree on what is visible
+"""
+
+
+def view_origin(cx, cy, view_w, view_h, world_w, world_h):
+    """
+    Top-left corner of a view_w x view_h view centred on (cx, cy), kept
+    inside the world (pinned to 0 when the world is smaller than the view).
+    """
+    x = min(max(0, int(cx - view_w / 2)), max(0, world_w - view_w))
+    y = min(max(0, int(cy - view_h / 2)), max(0, world_h - view_h))
+    return x, y
+
+
+def _span(grid, x0, y0, x1, y1):
+    """
+    First and last column and row of `grid` under a rectangle, clamped to
+    the grid. The hot part of every query, so kept free of helper calls.
+    """
+    size = grid.cell_size
+    last_c, last_r = grid.cols - 1, grid.rows - 1
+    c0, c1 = int(x0 // size), int(x1 // size)
+    r0, r1 = int(y0 // size), int(y1 // size)
+    return (0 if c0 < 0 else last_c if c0 > last_c else c0,
+            0 if c1 < 0 else last_c if c1 > last_c else c1,
+            0 if r0 < 0 else last_r if r0 > last_r else r0,
+            0 if r1 < 0 else last_r if r1 > last_r else r1)
+
+
+class SpatialGrid:
+    """
+    Items stored by point; query returns those inside a rectangle.
+    """
+
+    def __init__(self, width: int, height: int, cell_size: int):
+        """
+        :param width: world width in px (points outside are clamped to the edge cells)
+        :param height: world height in px
+        :param cell_size: cell edge in px; about the size of a typical query works well
+        """
+        self.cell_size = cell_size
+        self.cols = max(1, -(-width // cell_size))
+        self.rows = max(1, -(-height // cell_size))
+        self._cells = [[] for _ in range(self.cols * self.rows)]
+        self._used = []  # indices of non-empty cells, so clear() skips the empty ones
+        self.count = 0
+
+    def _col(self, x) -> int:
+        return min(self.cols - 1, max(0, int(x // self.cell_size)))
+
+    def _row(self, y) -> int:
+        return min(self.rows - 1, max(0, int(y // self.cell_size)))
+
+    def clear(self):
+        cells = self._cells
+        for i in self._used:
+            cells[i].clear()
+        self._used.clear()
+        self.count = 0
+
+    def insert(self, x, y, item):
+        i = self._row(y) * self.cols + self._col(x)
+        cell = self._cells[i]
+        if not cell:
+            self._used.append(i)
+        cell.append((x, y, item))
+        self.count += 1
+
+    def query(self, x0, y0, x1, y1) -> list:
+        """
+        Items whose point lies in [x0, x1) x [y0, y1), in no particular order.
+        """
+        out = []
+        cells = self._cells
+        cols = self.cols
+        c0, c1, r0, r1 = _span(self, x0, y0, x1, y1)
+        for row in range(r0, r1 + 1):
+            base = row * cols
+            for col in range(c0, c1 + 1):
+                for x, y, item in cells[base + col]:
+                    if x0 <= x < x1 and y0 <= y < y1:
+                        out.append(item)
+        return out
+
+
+class BoxGrid:
+    """
+    Static boxes (x0, y0, x1, y1); query returns those listed in the cells
+    a rectangle touches, as candidates for an exact test.
+    """
+
+    def __init__(self, boxes, width: int, height: int, cell_size: int):
+        """
+        :param boxes: (x0, y0, x1, y1) tuples; never changed afterwards
+        :param width: world width in px (boxes past the edge land in the edge cells)
+        :param height: world height in px
+        :param cell_size: cell edge in px
+        """
+        self.cell_size = cell_size
+        self.cols = max(1, -(-width // cell_size))
+        self.rows = max(1, -(-height // cell_size))
+        self._cells = [[] for _ in range(self.cols * self.rows)]
+        for box in boxes:
+            c0, c1, r0, r1 = _span(self, *box)
+            for row in range(r0, r1 + 1):
+                for col in range(c0, c1 + 1):
+                    self._cells[row * self.cols + col].append(box)
+
+    def query(self, x0, y0, x1, y1) -> list:
+        """
+        Boxes in the cells overlapping [x0, x1] x [y0, y1], each once. The
+        result may be an internal list: read it, do not modify it.
+        """
+        c0, c1, r0, r1 = _span(self, x0, y0, x1, y1)
+        if c0 == c1 and r0 == r1:
+            return self._cells[r0 * self.cols + c0]
+        out = []
+        for row in range(r0, r1 + 1):
+            base = row * self.cols
+            for col in range(c0, c1 + 1):
+                for box in self._cells[base + col]:
+                    if box not in out:  # boxes spanning several cells
+                        out.append(box)
+        return out
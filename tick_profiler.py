@@ -0,0 +1,266 @@
+# tick_profiler.py
+"""
+Per-phase tick timing for the arena simulation.
+
+- mark(phase) after each phase of a tick; a couple of perf_counter calls
+  per phase, nothing else on the hot path
+- Rolling histograms per phase over the last `window` ticks
+- Slow-tick log with the entity counts at the moment of the overrun
+- On request, cProfile the next N ticks and dump the stats to a file;
+  arenas sharing a process take turns, one profile at a time
+"""
+
+import collections
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+
+# bucket upper bounds in milliseconds; the last bucket is open-ended
+HISTOGRAM_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.7, 33.3, 66.7)
+
+# since CPython 3.12 cProfile hooks in process-wide (sys.monitoring) and a
+# second enabled profiler raises, so the arenas of one worker take turns:
+# held from the first profiled tick until the stats are dumped
+_PROFILE_LOCK = threading.Lock()
+
+
+class RollingHistogram:
+    """
+    Fixed-bucket histogram over the most recent `window` samples.
+    """
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS_MS, window: int = 600):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self._recent = collections.deque(maxlen=window)
+        self.total_count = 0
+        self.total_sum = 0.0
+
+    def add(self, value: float):
+        bucket = bisect_left(self.bounds, value)
+        if len(self._recent) == self._recent.maxlen:
+            self.counts[self._recent[0]] -= 1
+        self._recent.append(bucket)
+        self.counts[bucket] += 1
+        self.total_count += 1
+        self.total_sum += value
+
+    def percentile(self, pct: float) -> float:
+        """
+        Upper bound of the bucket holding the pct-th sample (inf for the
+        open bucket); 0.0 when empty.
+        """
+        n = len(self._recent)
+        if n == 0:
+            return 0.0
+        rank = pct / 100.0 * n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.bounds[i] if i < len(self.bounds) else float("inf")
+        return float("inf")
+
+
+class TickProfiler:
+    """
+    Collects phase timings for one arena's tick loop.
+
+    Usage per tick: begin_tick(); ... mark("phase") ...; end_tick(counts).
+    mark() outside begin/end is a no-op, so the simulation can be driven
+    without a profiler-aware loop (e.g. from bench.py).
+    """
+
+    def __init__(self, name: str, budget_ms: float, window: int = 600,
+                 slow_log_size: int = 50, output_dir: str = "profiles", log=print):
+        self.name = name
+        self.budget_ms = budget_ms
+        self.window = window
+        self.output_dir = output_dir
+        self.log = log
+        self.phases = {}  # phase -> RollingHistogram
+        self.total = RollingHistogram(window=window)
+        self.slow_ticks = collections.deque(maxlen=slow_log_size)
+        self.overruns = 0
+        self.tick = 0
+        self.last_tick_ms = 0.0
+
+        self._tick_start = None
+        self._last = 0.0
+        self._current = {}
+        self._last_slow_log = 0.0
+        self._suppressed = 0
+
+        self._profile_pending = 0
+        self._profile = None
+        self._profile_left = 0
+
+    def begin_tick(self):
+        if self._profile_pending and self._profile is None and _PROFILE_LOCK.acquire(blocking=False):
+            # (while another arena is profiling the request simply waits)
+            self._profile = cProfile.Profile()
+            self._profile_left = self._profile_pending
+            self._profile_pending = 0
+        if self._profile is not None:
+            # enabled only inside ticks so the sleep between them is not sampled
+            try:
+                self._profile.enable()
+            except ValueError as e:
+                # some other profiling tool (debugger, coverage) holds the hook
+                self.log(f"[{self.name}] Profiling unavailable: {e}")
+                self.cancel_profile()
+        self._current = {}
+        self._tick_start = self._last = time.perf_counter()
+
+    def mark(self, phase: str):
+        if self._tick_start is None:
+            return
+        now = time.perf_counter()
+        self._current[phase] = (now - self._last) * 1000.0
+        self._last = now
+
+    def end_tick(self, counts: dict = None):
+        """
+        Close the tick. `counts` (players/bullets/...) is only read when
+        the tick ran over budget.
+        """
+        if self._tick_start is None:
+            return
+        total_ms = (time.perf_counter() - self._tick_start) * 1000.0
+        self._tick_start = None
+        self.tick += 1
+        self.last_tick_ms = total_ms
+
+        for phase, ms in self._current.items():
+            hist = self.phases.get(phase)
+            if hist is None:
+                hist = self.phases[phase] = RollingHistogram(window=self.window)
+            hist.add(ms)
+        self.total.add(total_ms)
+
+        if total_ms > self.budget_ms:
+            self.overruns += 1
+            entry = {
+                "tick": self.tick,
+                "time": time.time(),
+                "total_ms": round(total_ms, 3),
+                "phases_ms": {k: round(v, 3) for k, v in self._current.items()},
+                "counts": dict(counts or {}),
+            }
+            self.slow_ticks.append(entry)
+            self._log_slow(entry)
+
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile_left -= 1
+            if self._profile_left <= 0:
+                profile = self._profile
+                self.cancel_profile()
+                self._dump_profile(profile)
+
+    def cancel_profile(self):
+        """
+        Drop a running profile (no dump) and let another arena take a turn.
+        Call from the tick thread, e.g. when its loop ends.
+        """
+        if self._profile is None:
+            return
+        self._profile.disable()
+        self._profile = None
+        _PROFILE_LOCK.release()
+
+    def _log_slow(self, entry):
+        # at most one line per second so an overloaded server does not also drown in logging
+        now = time.monotonic()
+        if now - self._last_slow_log < 1.0:
+            self._suppressed += 1
+            return
+        worst = max(entry["phases_ms"].items(), key=lambda kv: kv[1], default=("-", 0.0))
+        extra = f" (+{self._suppressed} more)" if self._suppressed else ""
+        counts = " ".join(f"{k}={v}" for k, v in entry["counts"].items())
+        self.log(f"[{self.name}] Slow tick {entry['tick']}: {entry['total_ms']:.1f} ms, "
+                 f"worst {worst[0]} {worst[1]:.1f} ms, {counts}{extra}")
+        self._last_slow_log = now
+        self._suppressed = 0
+
+    def request_profile(self, ticks: int):
+        """
+        cProfile the next `ticks` ticks; safe to call from any thread.
+        """
+        self._profile_pending = max(1, int(ticks))
+
+    def _dump_profile(self, profile):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, f"{self.name.lower().replace(' ', '')}_{stamp}.prof")
+        profile.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(15)
+        self.log(f"[{self.name}] Profile written to {path}\n{out.getvalue()}")
+        self.log(self.format_summary())
+
+    def summary(self) -> dict:
+        def describe(hist):
+            return {
+                "p50": hist.percentile(50),
+                "p99": hist.percentile(99),
+                "mean": hist.total_sum / hist.total_count if hist.total_count else 0.0,
+            }
+        return {
+            "ticks": self.tick,
+            "overruns": self.overruns,
+            "total_ms": describe(self.total),
+            "phases_ms": {phase: describe(h) for phase, h in self.phases.items()},
+        }
+
+    def format_summary(self) -> str:
+        s = self.summary()
+        lines = [f"[{self.name}] {s['ticks']} ticks, {s['overruns']} over budget"]
+        for phase, d in s["phases_ms"].items():
+            lines.append(f"    {phase:<18} mean {d['mean']:.3f} ms  p50<={d['p50']} p99<={d['p99']}")
+        return "\n".join(lines)
+
+
+class ProfileTrigger:
+    """
+    Watches a trigger file: every time its mtime changes, the profiler is
+    asked to cProfile the next N ticks (N read from the file, else default).
+    Checked at most once per `interval` seconds.
+    """
+
+    def __init__(self, path: str, default_ticks: int, interval: float = 1.0):
+        self.path = path
+        self.default_ticks = default_ticks
+        self.interval = interval
+        self._next_check = 0.0
+        self._seen_mtime = self._mtime()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self, profiler: TickProfiler):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.interval
+        mtime = self._mtime()
+        if mtime is None or mtime == self._seen_mtime:
+            return
+        self._seen_mtime = mtime
+        ticks = self.default_ticks
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read().strip()
+            if text:
+                ticks = int(text)
+        except (OSError, ValueError):
+            pass
+        profiler.log(f"[{profiler.name}] Profiling the next {ticks} ticks")
+        profiler.request_profile(ticks)
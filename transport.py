@@ -0,0 +1,190 @@
+# transport.py
+"""
+Stream transports shared by the server, the client and the tools.
+
+- "tcp": TCP tuned for small real-time messages: TCP_NODELAY, so inputs
+  and frames are not held back by Nagle's algorithm, and fixed socket
+  buffers (SOCKET_BUFFER_BYTES)
+- "unix": Unix-domain stream socket at a filesystem path, for bots and
+  tools on the same host
+- "loopback": in-process; connect() hands one end of a socketpair to a
+  listener registered under a name, so a server, bots and benchmarks can
+  share one process without ports
+- Every backend yields real socket objects, so MSG_PEEK, selectors and
+  passing sockets to worker processes keep working unchanged
+- send_frames writes several frames with one sendmsg call
+
+Addresses: "host[:port]" (tcp), "unix:/path/to.sock", "loopback:name".
+"""
+
+import itertools
+import os
+import queue
+import socket
+import threading
+
+from game_config import SERVER_PORT, SOCKET_BUFFER_BYTES
+
+_IOV_MAX = 64  # buffers per sendmsg call (POSIX only guarantees 16, Linux allows 1024)
+
+_loopback_listeners = {}  # name -> LoopbackListener
+_loopback_lock = threading.Lock()
+
+
+def parse_address(address: str, default_port: int = SERVER_PORT):
+    """
+    (kind, target): ("tcp", (host, port)), ("unix", path) or ("loopback", name).
+    """
+    kind, sep, rest = address.partition(":")
+    if sep and kind in ("unix", "loopback"):
+        return kind, rest
+    host, _, port = address.rpartition(":") if address.count(":") == 1 else (address, "", "")
+    return "tcp", (host, int(port) if port else default_port)
+
+
+def tune(sock):
+    """
+    Socket options for a connected stream socket of any backend.
+    """
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if SOCKET_BUFFER_BYTES and sock.family != getattr(socket, "AF_UNIX", None):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_BYTES)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_BYTES)
+    return sock
+
+
+class StreamListener:
+    """
+    Accepting socket for the tcp and unix backends. `sock` is the real
+    listening socket (usable with selectors).
+    """
+
+    def __init__(self, sock, address: str, path: str = None):
+        self.sock = sock
+        self.address = address
+        self._path = path
+        self._ids = itertools.count(1)
+
+    def accept(self):
+        conn, addr = self.sock.accept()
+        if self._path is not None:
+            # unix peers have no name; number them so log lines stay "kind:id"
+            addr = ("unix", next(self._ids))
+        return tune(conn), addr
+
+    def close(self):
+        self.sock.close()
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except OSError:
+                pass
+
+
+class LoopbackListener:
+    """
+    In-process listener: connect() queues the server end of a socketpair.
+    """
+
+    def __init__(self, name: str):
+        self.address = f"loopback:{name}"
+        self.name = name
+        self._pending = queue.Queue()
+        self._ids = itertools.count(1)
+
+    def _offer(self, conn):
+        self._pending.put((conn, ("loopback", next(self._ids))))
+
+    def accept(self):
+        item = self._pending.get()
+        if item is None:
+            raise OSError(f"{self.address} is closed")
+        return item
+
+    def close(self):
+        with _loopback_lock:
+            if _loopback_listeners.get(self.name) is self:
+                del _loopback_listeners[self.name]
+        self._pending.put(None)
+
+
+def listen(address: str, backlog: int = 128):
+    """
+    Open a listener for `address`; its accept() returns (socket, addr).
+    """
+    kind, target = parse_address(address)
+    if kind == "loopback":
+        listener = LoopbackListener(target)
+        with _loopback_lock:
+            if target in _loopback_listeners:
+                raise OSError(f"loopback:{target} is already listening")
+            _loopback_listeners[target] = listener
+        return listener
+    if kind == "unix":
+        try:
+            os.unlink(target)  # left over from a server that did not shut down cleanly
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(target)
+        sock.listen(backlog)
+        return StreamListener(sock, address, path=target)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if SOCKET_BUFFER_BYTES:
+        # set before listen() so accepted sockets negotiate a matching window
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_BYTES)
+    sock.bind(target)
+    sock.listen(backlog)
+    return StreamListener(sock, f"{target[0]}:{target[1]}")
+
+
+def connect(address: str, timeout: float = None):
+    """
+    Connected, tuned stream socket for `address` (blocking).
+    """
+    kind, target = parse_address(address)
+    if kind == "loopback":
+        with _loopback_lock:
+            listener = _loopback_listeners.get(target)
+        if listener is None:
+            raise ConnectionRefusedError(f"nothing listens on loopback:{target} in this process")
+        client_end, server_end = socket.socketpair()
+        listener._offer(server_end)
+        return client_end
+    if kind == "unix":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(target)
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(None)
+        return tune(sock)
+    sock = socket.create_connection(target, timeout=timeout)
+    sock.settimeout(None)
+    return tune(sock)
+
+
+def send_frames(sock, frames):
+    """
+    sendall for several frames at once: one sendmsg gathers all buffers
+    (one system call, and with TCP_NODELAY usually one packet), continuing
+    after partial writes.
+    """
+    if len(frames) == 1:
+        sock.sendall(frames[0])
+        return
+    if not hasattr(sock, "sendmsg"):
+        sock.sendall(b"".join(frames))
+        return
+    views = [memoryview(f) for f in frames if f]
+    while views:
+        sent = sock.sendmsg(views[:_IOV_MAX])
+        while views and sent >= len(views[0]):
+            sent -= len(views[0])
+            views.pop(0)
+        if sent:
+            views[0] = views[0][sent:]